@@ -664,4 +664,18 @@ async def _cleanup() -> None:
     count = await task.stop_all()
     if count > 0:
         logger.info(f"WebApp 插件停用，已停止 {count} 个任务")
+
+    # 释放共享 HTTP 连接池、编译 Worker 与解析缓存
+    # （直接走 _llm_stream 的幂等关闭，不依赖适配器是否已初始化）
+    from .runtime._llm_stream import aclose_clients
+    from .services.compiler_pool import get_compiler_pool
+    from .services.dependency_resolver import aclose_resolver_clients
+    from .services.deploy import aclose_http_client
+    from .services.resolver_cache import close_resolver_cache
+
+    await get_compiler_pool().aclose()
+    await aclose_clients()
+    await aclose_resolver_clients()
+    await aclose_http_client()
+    close_resolver_cache()
     logger.info("WebApp 插件已停用")
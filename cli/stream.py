@@ -81,10 +81,14 @@ class TaskStream:
             self._subscribers.remove(queue)
     
     async def emit(self, event: TaskEvent) -> None:
-        """发布事件"""
+        """发布事件
+
+        订阅者队列无界，put 永不阻塞；用 put_nowait 让整个发布
+        过程没有挂起点，连续的文件事件爆发不会逐个经过调度器。
+        """
         self._events.append(event)
         for queue in self._subscribers:
-            await queue.put(event)
+            queue.put_nowait(event)
     
     async def emit_notification(self, message: str) -> None:
         """发布通知事件"""
@@ -10,11 +10,30 @@ Text-to-Tool Bridge 架构的核心组件。
 
 import re
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from .logger import logger
 
 
+def clean_block_content(content: str) -> str:
+    """清理块内容
+
+    移除开头和结尾的空行，但保留代码缩进。
+    双指针定位首尾内容行，避免按行 split/join 的列表分配。
+    """
+    tail = len(content.rstrip(" \t\r\n"))
+    if tail == 0:
+        return ""
+    # 首个非空白字符所在行的行首
+    lead = len(content) - len(content.lstrip(" \t\r\n"))
+    start = content.rfind("\n", 0, lead) + 1
+    # 末个非空白字符所在行的行尾
+    end = content.find("\n", tail)
+    if end == -1:
+        end = len(content)
+    return content[start:end]
+
+
 class CommandType:
     """命令类型
     
@@ -85,7 +104,21 @@ class CommandStreamParser:
 
     current_content: str = ""
     """当前块的累积内容"""
-    
+
+    on_block_open: Optional[Callable[[str, Optional[str]], bool]] = field(default=None, repr=False)
+    """块开始回调 (block_name, block_arg) -> 是否启用流式传输
+
+    返回 True 时，块内容不再累积到 current_content，而是通过
+    on_block_content 增量推送；块结束时发出的 ParsedCommand 的
+    block_content 为 None。
+    """
+
+    on_block_content: Optional[Callable[[str], None]] = field(default=None, repr=False)
+    """流式块的内容增量回调"""
+
+    _streaming_block: bool = field(default=False, repr=False)
+    """当前块是否为流式传输模式"""
+
     # 缓存的正则（在首次使用时初始化）
     _block_start_pattern: Optional[re.Pattern[str]] = field(default=None, repr=False)
 
@@ -112,6 +145,13 @@ class CommandStreamParser:
         Returns:
             本次增量中完成的 ParsedCommand 列表
         """
+        # 快速路径：块内且无残留缓冲时，不含 "<" 的增量不可能构成
+        # 结束标记（所有结束标记以 "<<<" 开头），直接累积跳过正则。
+        # LLM 逐 token 推送时绝大多数增量走这条路，每 token O(1)。
+        if self.current_block_type is not None and not self.buffer and "<" not in chunk:
+            self._accumulate(chunk)
+            return []
+
         self.buffer += chunk
         commands: List[ParsedCommand] = []
 
@@ -155,6 +195,21 @@ class CommandStreamParser:
                     self.current_block_arg = block_match.group(2).strip()
                     self.current_content = ""
                     self.buffer = self.buffer[block_match.end() :]
+                    self._streaming_block = bool(
+                        self.on_block_open
+                        and self.on_block_open(self.current_block_type, self.current_block_arg),
+                    )
+                    if self._streaming_block:
+                        # 发出"块开始"事件，保证与其他命令的相对顺序
+                        commands.append(
+                            ParsedCommand(
+                                type=CommandType.BLOCK,
+                                block_name=self.current_block_type,
+                                block_arg=self.current_block_arg,
+                                block_content=None,
+                                block_complete=False,
+                            ),
+                        )
                     logger.debug(
                         f"[CommandParser] 块开始: {self.current_block_type}({self.current_block_arg})",
                     )
@@ -171,6 +226,21 @@ class CommandStreamParser:
                     if idx > 0:
                         self.buffer = self.buffer[idx:]
                         continue
+                else:
+                    # 纯文本（无任何标记片段）：只保留最后一行的尾部。
+                    # 标记前缀（"<<" / 行首 "@"）不含换行，截到换行处
+                    # 不会破坏跨 chunk 的标记，同时让重扫描的缓冲区
+                    # 有界，避免随闲聊文本线性增长导致每 token 全量重扫。
+                    nl = self.buffer.rfind("\n")
+                    if nl >= 0:
+                        self.buffer = self.buffer[nl + 1 :]
+                    if len(self.buffer) > 256:
+                        # 超长单行：只有尾部的 "<"/"@" 可能与后续增量
+                        # 拼成标记，前面的纯文本不会再参与任何匹配
+                        i = len(self.buffer)
+                        while i > 0 and self.buffer[i - 1] in "<@":
+                            i -= 1
+                        self.buffer = self.buffer[max(i, len(self.buffer) - 2) :]
                 break
 
             # 正在块内，寻找结束标记
@@ -179,8 +249,12 @@ class CommandStreamParser:
                 end_match = end_pattern.search(self.buffer)
                 if end_match:
                     # 找到结束标记
-                    self.current_content += self.buffer[: end_match.start()]
-                    cleaned_content = self._clean_content(self.current_content)
+                    self._accumulate(self.buffer[: end_match.start()])
+                    if self._streaming_block:
+                        # 流式块：内容已通过回调推送，不再携带完整内容
+                        cleaned_content = None
+                    else:
+                        cleaned_content = clean_block_content(self.current_content)
 
                     commands.append(
                         ParsedCommand(
@@ -193,7 +267,7 @@ class CommandStreamParser:
                     )
                     logger.debug(
                         f"[CommandParser] 块完成: {self.current_block_type}({self.current_block_arg}) "
-                        f"({len(cleaned_content)} 字符)",
+                        f"({len(cleaned_content or '')} 字符)",
                     )
 
                     # 重置状态
@@ -201,20 +275,33 @@ class CommandStreamParser:
                     self.current_block_type = None
                     self.current_block_arg = None
                     self.current_content = ""
+                    self._streaming_block = False
                     continue
 
             # 未找到结束标记，继续累积
             if "<<<" in self.buffer:
                 idx = self.buffer.rfind("<<<")
-                self.current_content += self.buffer[:idx]
+                self._accumulate(self.buffer[:idx])
                 self.buffer = self.buffer[idx:]
             else:
-                self.current_content += self.buffer
+                self._accumulate(self.buffer)
                 self.buffer = ""
             break
 
         return commands
 
+    def _accumulate(self, delta: str) -> None:
+        """累积块内容
+
+        流式块直接通过回调推送增量，否则累积到 current_content。
+        """
+        if not delta:
+            return
+        if self._streaming_block and self.on_block_content:
+            self.on_block_content(delta)
+        else:
+            self.current_content += delta
+
     def flush(self) -> List[ParsedCommand]:
         """流结束时刷新缓冲区
 
@@ -249,13 +336,18 @@ class CommandStreamParser:
                 self.buffer = ""
 
         # 2. 处理未完成的块
-        if self.current_block_type and self.current_content:
+        if self.current_block_type and (self.current_content or self._streaming_block):
+            if self._streaming_block:
+                self._accumulate(self.buffer)
+                block_content = None
+            else:
+                block_content = clean_block_content(self.current_content + self.buffer)
             commands.append(
                 ParsedCommand(
                     type=CommandType.BLOCK,
                     block_name=self.current_block_type,
                     block_arg=self.current_block_arg,
-                    block_content=self._clean_content(self.current_content + self.buffer),
+                    block_content=block_content,
                     block_complete=False,
                 ),
             )
@@ -265,6 +357,7 @@ class CommandStreamParser:
             self.current_block_type = None
             self.current_block_arg = None
             self.current_content = ""
+            self._streaming_block = False
             self.buffer = ""
 
         return commands
@@ -275,18 +368,11 @@ class CommandStreamParser:
         self.current_block_type = None
         self.current_block_arg = None
         self.current_content = ""
+        self._streaming_block = False
 
     def _clean_content(self, content: str) -> str:
-        """清理内容
-
-        移除开头和结尾的空行，但保留代码缩进。
-        """
-        lines = content.split("\n")
-        while lines and not lines[0].strip():
-            lines.pop(0)
-        while lines and not lines[-1].strip():
-            lines.pop()
-        return "\n".join(lines)
+        """清理内容（兼容旧 API，见模块级 clean_block_content）"""
+        return clean_block_content(content)
 
     @property
     def is_parsing_block(self) -> bool:
@@ -14,11 +14,13 @@
 
 import asyncio
 from asyncio import CancelledError, Queue
+from collections import deque
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
-from .command_parser import CommandStreamParser, CommandType, ParsedCommand
+from ..tools.block_tools import get_block_tool
+from .command_parser import CommandStreamParser, CommandType, ParsedCommand, clean_block_content
 from .logger import logger
 from .streaming_client import stream_text_completion
 
@@ -46,6 +48,12 @@ class ControlUnit:
     # FILE 类型
     file_path: Optional[str] = None
     file_content: Optional[str] = None
+    file_content_stream: Optional["Queue[Optional[str]]"] = None
+    """流式文件内容队列
+
+    解析器检测到块开始时立即创建，内容增量逐块入队，
+    None 作为结束哨兵。为空时走缓冲路径 (file_content)。
+    """
 
     # TOOL_CALL 类型
     tool_name: Optional[str] = None
@@ -66,20 +74,25 @@ class ControlUnit:
         return "END"
 
 
+# 块名 -> (行工具名, 参数构造器) 映射
+# 块名由解析器保证为大写，此处无需再 .upper()
+_BLOCK_TOOL_MAPPING: Dict[str, Any] = {
+    "DIFF": ("apply_diff", lambda cmd: {"path": cmd.block_arg, "diff": cmd.block_content}),
+}
+
+
 def process_block_command(cmd: ParsedCommand) -> ControlUnit:
     """处理块命令，根据块类型转换为 ControlUnit
-    
+
     Args:
         cmd: 解析出的块命令
-        
+
     Returns:
         ControlUnit: FILE 类型直接写入，DIFF 类型调用 apply_diff
     """
-    from ..tools.block_tools import get_block_tool
-    
     block_name = cmd.block_name or ""
     block_tool = get_block_tool(block_name)
-    
+
     if block_tool is None:
         # 未知块类型，当作文件处理
         logger.warning(f"未知块类型 {block_name}，当作 FILE 处理")
@@ -88,7 +101,7 @@ def process_block_command(cmd: ParsedCommand) -> ControlUnit:
             file_path=cmd.block_arg,
             file_content=cmd.block_content,
         )
-    
+
     if block_tool.is_direct_write:
         # 直接写入类型（如 FILE）
         return ControlUnit(
@@ -96,21 +109,17 @@ def process_block_command(cmd: ParsedCommand) -> ControlUnit:
             file_path=cmd.block_arg,
             file_content=cmd.block_content,
         )
-    
+
     # 需要调用工具的类型（如 DIFF -> apply_diff）
-    # 根据块名映射到对应的行工具
-    tool_mapping = {
-        "DIFF": ("apply_diff", {"path": cmd.block_arg, "diff": cmd.block_content}),
-    }
-    
-    if block_name.upper() in tool_mapping:
-        tool_name, tool_args = tool_mapping[block_name.upper()]
+    mapping = _BLOCK_TOOL_MAPPING.get(block_name)
+    if mapping is not None:
+        tool_name, build_args = mapping
         return ControlUnit(
             type=ControlUnitType.TOOL_CALL,
             tool_name=tool_name,
-            tool_args=tool_args,
+            tool_args=build_args(cmd),
         )
-    
+
     # 未配置映射，尝试直接调用 block handler
     # 这种情况理论上不应该发生，因为所有非直接写入的块都应该配置映射
     logger.warning(f"块类型 {block_name} 未配置工具映射，当作 FILE 处理")
@@ -121,6 +130,20 @@ def process_block_command(cmd: ParsedCommand) -> ControlUnit:
     )
 
 
+class _DrainableQueue(Queue):
+    """支持一次性排空的 asyncio.Queue
+
+    直接交换底层 deque，避免逐项 get_nowait 的
+    future/异常开销（队列在取消后可能残留大量单元）。
+    """
+
+    def drain(self) -> List["ControlUnit"]:
+        """取出并清空所有剩余单元"""
+        items = list(self._queue)  # noqa: SLF001 - 访问 Queue 内部 deque
+        self._queue.clear()
+        return items
+
+
 @dataclass
 class IterationResult:
     """单次迭代结果"""
@@ -151,10 +174,10 @@ class StreamProcessor:
         self.tracer = tracer
 
         # 运行时状态
-        self._queue: Queue[ControlUnit] = Queue()
+        self._queue: _DrainableQueue = _DrainableQueue()
         self._executed_units: List[ControlUnit] = []
         self._discarded_units: List[ControlUnit] = []
-        self._assistant_content: str = ""
+        self._assistant_parts: List[str] = []
         self._error: Optional[str] = None
         self._completed: bool = False
         self._truncated: bool = False
@@ -192,10 +215,10 @@ class StreamProcessor:
             IterationResult
         """
         # 重置状态
-        self._queue = Queue()
+        self._queue = _DrainableQueue()
         self._executed_units = []
         self._discarded_units = []
-        self._assistant_content = ""
+        self._assistant_parts = []
         self._error = None
         self._completed = False
         self._truncated = False
@@ -211,25 +234,29 @@ class StreamProcessor:
             self._consumer(ctx),
         )
 
-        # 等待两个任务完成
+        # 等待两个任务完成；任一任务异常时立即取消另一个
+        # （此前 return_exceptions=True 会吞掉异常，消费者只能等 END 标记）
+        tasks = (self._producer_task, consumer_task)
         try:
-            await asyncio.gather(
-                self._producer_task,
-                consumer_task,
-                return_exceptions=True,
-            )
+            await asyncio.gather(*tasks)
+        except CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
         except Exception as e:
             self._log("error", f"迭代异常: {e}", exception=str(e))
-            self._error = str(e)
+            if self._error is None:
+                self._error = str(e)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            # 等待兄弟任务清理完成，清理阶段异常不再上抛
+            await asyncio.gather(*tasks, return_exceptions=True)
 
         # 清空队列中剩余的单元（被丢弃的）
-        while not self._queue.empty():
-            try:
-                unit = self._queue.get_nowait()
-                if unit.type != ControlUnitType.END:
-                    self._discarded_units.append(unit)
-            except asyncio.QueueEmpty:
-                break
+        self._discarded_units.extend(
+            unit for unit in self._queue.drain() if unit.type != ControlUnitType.END
+        )
 
         if self._discarded_units:
             self._log(
@@ -244,10 +271,14 @@ class StreamProcessor:
             f"完成={self._completed}, 错误={self._error is not None}",
         )
 
+        # 在此处一次性合并，避免逐 token 拼接的中间字符串
+        assistant_content = "".join(self._assistant_parts)
+        self._assistant_parts = []
+
         return IterationResult(
             executed_units=self._executed_units,
             discarded_units=self._discarded_units,
-            assistant_content=self._assistant_content,
+            assistant_content=assistant_content,
             error=self._error,
             completed=self._completed,
             truncated=self._truncated,
@@ -259,7 +290,58 @@ class StreamProcessor:
         model_group: str,
     ) -> None:
         """生产者：接收 LLM 纯文本流，使用 CommandStreamParser 解析"""
-        parser = CommandStreamParser()
+        # 流式 FILE 块状态：on_block_open/on_block_content 在 feed() 内部
+        # 即时触发，而命令列表要等 feed() 返回后才被逐条消费；一次 feed
+        # 可能跨越多个块边界（SSE 常把多行打包在同一 chunk），因此
+        # 开始/结束事件各用一个 FIFO 与命令顺序对齐，单个可变槽位会
+        # 在跨界 chunk 上错配单元（丢文件或哨兵丢失导致消费者挂起）。
+        # 内容增量始终路由到最新开启的块（与解析器的累积目标一致）
+        pending_open: "deque[ControlUnit]" = deque()  # 已创建、开始事件尚未消费
+        pending_close: "deque[ControlUnit]" = deque()  # 已入主队列、尚未关闭
+        stream_state: Dict[str, Any] = {"current": None}
+
+        def on_block_open(block_name: str, block_arg: Optional[str]) -> bool:
+            """块开始回调：直接写入型块启用流式传输
+
+            立即创建带内容队列的 ControlUnit，
+            避免整个文件内容在解析器中缓冲。
+            """
+            block_tool = get_block_tool(block_name)
+            if block_tool is None or not block_tool.is_direct_write:
+                return False
+            unit = ControlUnit(
+                type=ControlUnitType.FILE,
+                file_path=block_arg,
+                file_content_stream=Queue(),
+            )
+            pending_open.append(unit)
+            stream_state["current"] = unit
+            return True
+
+        def on_block_content(delta: str) -> None:
+            """内容增量回调：推送到最新开启的流式单元"""
+            unit = stream_state["current"]
+            if unit is not None and unit.file_content_stream is not None:
+                unit.file_content_stream.put_nowait(delta)
+
+        def close_next_stream_unit() -> None:
+            """关闭最早未关闭的流式单元（放入结束哨兵）"""
+            if pending_close:
+                unit = pending_close.popleft()
+                if unit.file_content_stream is not None:
+                    unit.file_content_stream.put_nowait(None)
+
+        def close_all_stream_units() -> None:
+            """关闭所有残留的流式单元，避免消费者永久等待"""
+            while pending_close:
+                close_next_stream_unit()
+            pending_open.clear()
+            stream_state["current"] = None
+
+        parser = CommandStreamParser(
+            on_block_open=on_block_open,
+            on_block_content=on_block_content,
+        )
         chunk_count = 0
 
         # 记录 LLM 请求开始
@@ -288,11 +370,27 @@ class StreamProcessor:
                     break
 
                 # 累积 text 内容
-                self._assistant_content += text_chunk
+                self._assistant_parts.append(text_chunk)
 
                 # 解析命令
                 for cmd in parser.feed(text_chunk):
                     if cmd.type == CommandType.BLOCK:
+                        if cmd.block_content is None:
+                            if not cmd.block_complete and pending_open:
+                                # 流式块开始事件：按解析顺序入主队列
+                                unit = pending_open.popleft()
+                                pending_close.append(unit)
+                                await self._queue.put(unit)
+                                continue
+                            # 流式块结束：内容已增量推送，关闭内容流
+                            close_next_stream_unit()
+                            self._log(
+                                "info",
+                                f"{cmd.block_name} 流式块完成: {cmd.block_arg}",
+                                block_name=cmd.block_name,
+                                block_arg=cmd.block_arg,
+                            )
+                            continue
                         # 块工具（FILE, DIFF 等）
                         unit = process_block_command(cmd)
                         self._log(
@@ -323,6 +421,16 @@ class StreamProcessor:
             remaining_commands = parser.flush()
             for cmd in remaining_commands:
                 if cmd.type == CommandType.BLOCK:
+                    if cmd.block_content is None:
+                        # 流式块未完整结束：残留内容已推送，关闭内容流即可
+                        close_next_stream_unit()
+                        self._log(
+                            "warning",
+                            f"{cmd.block_name} 流式块未完整但已处理: {cmd.block_arg}",
+                            block_name=cmd.block_name,
+                            block_arg=cmd.block_arg,
+                        )
+                        continue
                     # 块工具
                     unit = process_block_command(cmd)
                     self._log(
@@ -358,6 +466,8 @@ class StreamProcessor:
             self._log("error", f"Producer 异常: {e}", exception=str(e))
             raise
         finally:
+            # 关闭可能残留的流式单元，避免消费者永久等待
+            close_all_stream_units()
             # 放入结束标记
             await self._queue.put(ControlUnit(type=ControlUnitType.END))
             self._log("debug", "Producer 放入 END 标记")
@@ -385,6 +495,17 @@ class StreamProcessor:
                 if unit.type == ControlUnitType.FILE:
                     # 写入文件
                     try:
+                        if unit.file_content_stream is not None:
+                            # 流式路径：逐块消费内容增量，与生产者解析重叠
+                            # write_file (VFS) 不支持增量写入，最终合并后一次写入
+                            parts: List[str] = []
+                            while True:
+                                piece = await unit.file_content_stream.get()
+                                if piece is None:
+                                    break
+                                parts.append(piece)
+                            unit.file_content = clean_block_content("".join(parts))
+                            unit.file_content_stream = None
                         self.write_file(unit.file_path, unit.file_content)
                         unit.executed = True
                         unit.success = True
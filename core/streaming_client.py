@@ -10,6 +10,7 @@ from typing import Any, AsyncIterator, Dict, List, Optional
 import httpx
 from openai import AsyncOpenAI
 
+from ..runtime import get_adapter
 from .logger import logger
 
 DEFAULT_USER_AGENT = "NekroWebApp/3.0"
@@ -40,7 +41,7 @@ def _create_http_client(
     )
 
 
-async def stream_text_completion(
+def stream_text_completion(
     messages: List[Dict[str, Any]],
     model_group: str,
     proxy_url: Optional[str] = None,  # noqa: ARG001 - 保留接口兼容
@@ -50,27 +51,25 @@ async def stream_text_completion(
     通过运行时适配器获取模型配置。
     不传递 tools 参数，LLM 只输出纯文本。
 
+    直接返回适配器的流迭代器（零拷贝透传），
+    避免每个 token 多经过一层 async 生成器。
+
     Args:
         messages: 消息列表
         model_group: 模型组名称
         proxy_url: 可选代理 URL（由适配器内部处理）
 
-    Yields:
-        str: 文本内容增量
+    Returns:
+        文本内容增量的异步迭代器
     """
-    from ..runtime import get_adapter
-    
     adapter = get_adapter()
-    
-    # 通过适配器的 stream_llm 方法完成调用
-    async for chunk in adapter.stream_llm(messages, model_group):
-        yield chunk
+    return adapter.stream_llm(messages, model_group)
 
 
 # ==================== 兼容旧接口 ====================
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolCallDelta:
     """Tool Call 增量数据 (已废弃，保留兼容)"""
     index: int
@@ -79,7 +78,7 @@ class ToolCallDelta:
     arguments_delta: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamChunk:
     """流式响应块 (已废弃，保留兼容)"""
     content_delta: Optional[str] = None
@@ -97,11 +96,16 @@ async def stream_tool_call_completion(
 
     WARNING: 此函数已废弃，将在迁移完成后删除。
     请使用 stream_text_completion() 替代。
+
+    注意：为避免每 token 一次对象分配，迭代期间复用同一个
+    StreamChunk 实例，调用方不得跨迭代保留引用。
     """
     logger.warning(
         "[StreamingClient] stream_tool_call_completion 已废弃，"
         "请迁移到 stream_text_completion",
     )
 
+    chunk = StreamChunk()
     async for text in stream_text_completion(messages, model_group, proxy_url):
-        yield StreamChunk(content_delta=text)
+        chunk.content_delta = text
+        yield chunk
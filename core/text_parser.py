@@ -11,8 +11,12 @@ FILE block 格式:
 """
 
 import re
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Deque, List, Optional
+
+_MARKER_PATTERN: re.Pattern[str] = re.compile(r"<<<FILE:\s*([^>]+)>>>|<<<END_FILE>>>")
+"""合并的标记正则：group(1) 非空为文件开始，否则为文件结束"""
 
 
 @dataclass
@@ -76,8 +80,12 @@ class TextStreamParser:
     current_content: str = ""
     """当前文件的累积内容"""
 
-    completed_blocks: List[FileBlock] = field(default_factory=list)
-    """已完成的文件块列表"""
+    completed_blocks: Deque[FileBlock] = field(default_factory=lambda: deque(maxlen=32))
+    """已完成的文件块（仅保留最近 32 个）
+
+    调用方通过 feed() 返回值获取完成块，此处仅留作调试参考；
+    有界避免长会话中持有所有文件内容导致内存泄漏。
+    """
 
     def feed(self, chunk: str) -> List[FileBlock]:
         """处理增量文本
@@ -88,57 +96,57 @@ class TextStreamParser:
         Returns:
             本次增量中完成的 FileBlock 列表
         """
-        self.buffer += chunk
+        # 快速路径：正在解析文件体且本次增量不可能构成标记
+        # （增量中没有 "<"，缓冲尾部也没有待补全的 "<<<"），
+        # 直接追加内容返回，跳过正则扫描。文件体内绝大多数 token 走此路径。
+        if self.current_file is not None and "<" not in chunk and "<<<" not in self.buffer:
+            self.current_content += self.buffer + chunk
+            self.buffer = ""
+            return []
+
+        buf = self.buffer + chunk
         completed: List[FileBlock] = []
 
-        while True:
+        # 单趟扫描所有标记，避免缓冲区内多个标记时的重复 search
+        pos = 0  # 已消费位置
+        for match in _MARKER_PATTERN.finditer(buf):
             if self.current_file is None:
-                # 寻找文件开始标记
-                match = self.FILE_START_PATTERN.search(self.buffer)
-                if match:
-                    self.current_file = match.group(1).strip()
-                    self.buffer = self.buffer[match.end() :]
-                    self.current_content = ""
-                else:
-                    # 保留可能被截断的标记
-                    # 例如 "<<<FILE:" 可能在下一个 chunk 中完成
-                    if "<<<" in self.buffer:
-                        idx = self.buffer.rfind("<<<")
-                        # 只保留最后一个 <<< 之后的内容
-                        if idx > 0:
-                            self.buffer = self.buffer[idx:]
-                    else:
-                        self.buffer = ""
-                    break
+                if match.group(1) is None:
+                    # 游离的 END_FILE 标记，忽略（连同之前的散落文本丢弃）
+                    continue
+                self.current_file = match.group(1).strip()
+                self.current_content = ""
+                pos = match.end()
+            else:
+                if match.group(1) is not None:
+                    # 文件体内的 FILE 开始标记当作普通内容
+                    continue
+                # 找到结束标记
+                self.current_content += buf[pos : match.start()]
+                block = FileBlock(
+                    path=self.current_file,
+                    content=self._clean_content(self.current_content),
+                    complete=True,
+                )
+                completed.append(block)
+                self.completed_blocks.append(block)
+
+                self.current_file = None
+                self.current_content = ""
+                pos = match.end()
+
+        # 处理尾部剩余内容，保留可能被截断的 <<< 标记
+        remainder = buf[pos:]
+        idx = remainder.rfind("<<<")
+        if self.current_file is not None:
+            if idx != -1:
+                self.current_content += remainder[:idx]
+                self.buffer = remainder[idx:]
             else:
-                # 寻找文件结束标记
-                match = self.FILE_END_PATTERN.search(self.buffer)
-                if match:
-                    # 找到结束标记
-                    self.current_content += self.buffer[: match.start()]
-                    block = FileBlock(
-                        path=self.current_file,
-                        content=self._clean_content(self.current_content),
-                        complete=True,
-                    )
-                    completed.append(block)
-                    self.completed_blocks.append(block)
-
-                    # 重置状态，继续处理剩余内容
-                    self.buffer = self.buffer[match.end() :]
-                    self.current_file = None
-                    self.current_content = ""
-                else:
-                    # 未找到结束标记，继续累积
-                    # 保留可能被截断的 <<< 标记
-                    if "<<<" in self.buffer:
-                        idx = self.buffer.rfind("<<<")
-                        self.current_content += self.buffer[:idx]
-                        self.buffer = self.buffer[idx:]
-                    else:
-                        self.current_content += self.buffer
-                        self.buffer = ""
-                    break
+                self.current_content += remainder
+                self.buffer = ""
+        else:
+            self.buffer = remainder[idx:] if idx != -1 else ""
 
         return completed
 
@@ -173,14 +181,9 @@ class TextStreamParser:
 
         移除开头和结尾的空行，但保留代码缩进。
         """
-        # 移除开头的空行
-        lines = content.split("\n")
-        while lines and not lines[0].strip():
-            lines.pop(0)
-        # 移除结尾的空行
-        while lines and not lines[-1].strip():
-            lines.pop()
-        return "\n".join(lines)
+        from .command_parser import clean_block_content
+
+        return clean_block_content(content)
 
     @property
     def is_parsing(self) -> bool:
@@ -4,10 +4,13 @@ Developer 是核心开发者，负责编写所有代码。
 使用纯文本协议输出，通过标记控制操作。
 """
 
+from functools import lru_cache
 from typing import Optional
 
 from ..core.context import ProductSpec
 
+# LANGUAGE 在导入期冻结：运行时改配置不会自动反映到 Prompt，
+# 需要显式调用 set_language() 重建（见模块尾部）
 try:
     from ..plugin import config
     LANGUAGE = getattr(config, "LANGUAGE", "Chinese")
@@ -15,11 +18,11 @@ except (ImportError, ModuleNotFoundError):
     LANGUAGE = "Chinese"
 
 
-def build_system_prompt(spec: Optional[ProductSpec] = None) -> str:
-    """构建 Developer 的系统 Prompt"""
-
-    # 基础角色定义
-    base_prompt = f"""# Developer Agent
+# 两段式 Prompt：静态前缀在所有调用间字节一致，语言段随配置变化但
+# 会话内稳定。把变化点都压到末尾，支持前缀缓存的 LLM API
+# （OpenAI 自动前缀缓存 / Anthropic cache_control）可以命中系统
+# 消息的绝大部分 token。
+_STATIC_PREFIX = """# Developer Agent
 
 你是一个专业的 Web 应用开发者，使用 React + TypeScript 技术栈。
 
@@ -89,9 +92,9 @@ ReactDOM.createRoot(document.getElementById('root')!).render(
 ```
 <<<FILE: src/App.tsx>>>
 import React from 'react';
-export default function App() {{
+export default function App() {
   return <div>Hello</div>;
-}}
+}
 <<<END_FILE>>>
 ```
 
@@ -171,9 +174,9 @@ ReactDOM.createRoot(document.getElementById('root')!).render(<App />)
 <<<END_FILE>>>
 
 <<<FILE: src/App.tsx>>>
-export default function App() {{
+export default function App() {
   return <div>Hello World</div>
-}}
+}
 <<<END_FILE>>>
 
 @@DONE summary="创建了基础项目结构" title="My App"
@@ -213,36 +216,111 @@ export default function App() {{
 - ✅ 保留原有功能（修改任务）
 - ❌ 不要留下 TODO 或占位符
 - ❌ 不要删除或简化现有功能
+"""
 
+def _render_language_section(language: str) -> str:
+    return f"""
 ## 语言偏好
 
-用户偏好语言: **{LANGUAGE}**
+用户偏好语言: **{language}**
 - UI 文本必须使用此语言
 - 代码注释可使用英文
 """
 
-    # 如果有 ProductSpec，添加规格信息
-    if spec:
-        spec_section = f"""
+
+# 语言段单独拼接（导入期冻结），保持上面的静态前缀不含任何插值
+_LANGUAGE_SECTION = _render_language_section(LANGUAGE)
+
+_BASE_PROMPT = _STATIC_PREFIX + _LANGUAGE_SECTION
+
+
+@lru_cache(maxsize=64)
+def _build_with_spec(
+    name: str,
+    description: str,
+    type_contracts: str,
+    design_notes: str,
+) -> str:
+    """构建附带产品规格的 Prompt（按规格字段记忆化）"""
+    return f"""{_BASE_PROMPT}
 
 ## 产品规格
 
-**名称**: {spec.name}
-**描述**: {spec.description}
+**名称**: {name}
+**描述**: {description}
 
 ### 类型定义
 
 ```typescript
-{spec.type_contracts}
+{type_contracts}
 ```
 
 ### 设计要点
 
-{spec.design_notes}
+{design_notes}
 """
-        base_prompt += spec_section
 
-    return base_prompt
+
+def build_system_prompt(spec: Optional[ProductSpec] = None) -> str:
+    """构建 Developer 的系统 Prompt"""
+    if spec is None:
+        return _BASE_PROMPT
+    return _build_with_spec(spec.name, spec.description, spec.type_contracts, spec.design_notes)
+
+
+# ==================== Token 计数 ====================
+# 基础 Prompt 是静态的，token 数只需计算一次；tiktoken 为可选依赖
+# （且首次编码需要下载 BPE 数据），不可用时退化为 ~4 字符/token 估算。
+
+_base_prompt_token_count_cache: Optional[int] = None
+
+
+def _count_tokens(text: str) -> int:
+    try:
+        import tiktoken
+
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    except Exception:
+        return len(text) // 4
+
+
+def base_prompt_token_count() -> int:
+    """静态系统 Prompt 的 token 数（首次调用后缓存）"""
+    global _base_prompt_token_count_cache
+    if _base_prompt_token_count_cache is None:
+        _base_prompt_token_count_cache = _count_tokens(_BASE_PROMPT)
+    return _base_prompt_token_count_cache
+
+
+@lru_cache(maxsize=64)
+def _spec_token_count(name: str, description: str, type_contracts: str, design_notes: str) -> int:
+    return _count_tokens(_build_with_spec(name, description, type_contracts, design_notes)[len(_BASE_PROMPT):])
+
+
+def prompt_token_count(spec: Optional[ProductSpec] = None) -> int:
+    """系统 Prompt 的 token 数：静态部分复用缓存，只对 spec 增量编码"""
+    total = base_prompt_token_count()
+    if spec is not None:
+        total += _spec_token_count(spec.name, spec.description, spec.type_contracts, spec.design_notes)
+    return total
+
+
+def set_language(language: str) -> None:
+    """运行时切换 Prompt 的语言偏好
+
+    LANGUAGE 默认在导入期冻结，后续配置变更不会自动生效；
+    需要切换时调用此函数重建基础 Prompt，并清空所有按旧
+    Prompt 记忆化的缓存。
+    """
+    global LANGUAGE, _LANGUAGE_SECTION, _BASE_PROMPT, _base_prompt_token_count_cache
+    if language == LANGUAGE:
+        return
+    LANGUAGE = language
+    _LANGUAGE_SECTION = _render_language_section(language)
+    _BASE_PROMPT = _STATIC_PREFIX + _LANGUAGE_SECTION
+    _build_with_spec.cache_clear()
+    _spec_token_count.cache_clear()
+    _base_prompt_token_count_cache = None
 
 
 def build_file_context(files: list[str], exports: dict[str, list[str]]) -> str:
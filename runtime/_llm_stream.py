@@ -0,0 +1,97 @@
+"""OpenAI 兼容 API 流式调用的共享热路径
+
+两个适配器（nekro-agent / 独立 CLI）的流式调用此前是近乎相同的
+两份实现，任何针对每 token 的优化都要改两处。此模块集中持有：
+
+- 按 (base_url, api_key, proxy) 缓存的 httpx/AsyncOpenAI 客户端池
+- raw-SSE 解析循环（跳过每 chunk 的 Pydantic 模型构造）
+
+适配器只负责解析各自的模型配置，然后委托到这里。
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+
+from .adapter import _lazy_openai
+
+# (base_url, api_key, proxy_url) -> (httpx.AsyncClient, AsyncOpenAI)
+# 跨调用复用连接池，避免每次 LLM 调用重建 TCP+TLS
+_clients: Dict[Tuple[str, str, str], Any] = {}
+
+
+def get_client(
+    api_key: Optional[str],
+    base_url: Optional[str],
+    proxy_url: Optional[str] = None,
+) -> Any:
+    """获取缓存的 AsyncOpenAI 客户端（按端点+密钥+代理复用连接池）"""
+    key = (base_url or "", api_key or "", proxy_url or "")
+    cached = _clients.get(key)
+    if cached is None:
+        httpx, AsyncOpenAI = _lazy_openai()
+        # 显式构建 transport：proxies= 在新版 httpx 已移除，且传 None
+        # 也会走代理解析路径；无代理时完全跳过
+        transport = httpx.AsyncHTTPTransport(proxy=proxy_url, retries=1) if proxy_url else None
+        http_client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(connect=30, read=300, write=300, pool=30),
+            limits=httpx.Limits(max_keepalive_connections=8),
+        )
+        cached = (
+            http_client,
+            AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client),
+        )
+        _clients[key] = cached
+    return cached[1]
+
+
+async def stream_openai_compatible(
+    api_key: Optional[str],
+    base_url: Optional[str],
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: Optional[float] = None,
+    proxy_url: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """流式调用并逐段产出文本增量
+
+    走 SDK 的 raw-response 模式直接解析 SSE 行：一次响应有数千个
+    流式 chunk，逐个构造 Pydantic 模型的开销可观，而这里只需要
+    delta.content 一个字段。请求构建、鉴权与重试仍由 SDK 负责。
+    """
+    client = get_client(api_key, base_url, proxy_url)
+
+    response = await client.chat.completions.with_raw_response.create(
+        model=model,
+        messages=messages,  # type: ignore[arg-type]
+        temperature=temperature,
+        stream=True,
+    )
+
+    http_response = response.http_response
+    try:
+        async for line in http_response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                break
+            payload = orjson.loads(data)
+            choices = payload.get("choices")
+            if not choices:
+                continue
+            content = choices[0].get("delta", {}).get("content")
+            if content:
+                yield content
+    finally:
+        await http_response.aclose()
+
+
+async def aclose_clients() -> None:
+    """关闭所有缓存的客户端连接（幂等）"""
+    global _clients
+    clients, _clients = _clients, {}
+    for http_client, client in clients.values():
+        await client.close()
+        await http_client.aclose()
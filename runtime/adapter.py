@@ -4,13 +4,42 @@
 不同运行模式（nekro-agent/独立 CLI）通过不同适配器实现。
 """
 
-from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Protocol, runtime_checkable
 
 if TYPE_CHECKING:
     from ..cli.config.settings import WebAppConfig
 
 
+def _lazy_openai() -> Any:
+    """延迟导入 httpx / openai SDK
+
+    两个适配器的 LLM 客户端构建共用。只在第一次实际调用 LLM 时
+    触发导入，避免插件加载阶段支付这两个重量级包的导入开销。
+    """
+    import httpx
+    from openai import AsyncOpenAI
+
+    return httpx, AsyncOpenAI
+
+
+def _build_log_dispatch(logger: Any) -> Dict[str, Any]:
+    """构建 level -> 已绑定日志方法的分发表
+
+    log() 是热路径（编译期 debug 日志量大），预绑定方法
+    省掉每条日志的 str.lower() 分配和 getattr 的属性查找。
+    大写键覆盖调用方直接传 "INFO"/"WARNING" 的情况。
+    """
+    dispatch = {
+        "debug": logger.debug,
+        "info": logger.info,
+        "warning": logger.warning,
+        "error": logger.error,
+    }
+    for level, func in list(dispatch.items()):
+        dispatch[level.upper()] = func
+    return dispatch
+
+
 # ==================== 全局适配器实例 ====================
 
 _current_adapter: Optional["RuntimeAdapter"] = None
@@ -33,21 +62,35 @@ def set_adapter(adapter: "RuntimeAdapter") -> None:
     global _current_adapter
     _current_adapter = adapter
 
+    # 换适配器意味着配置和日志来源变了，清掉依赖它的快照缓存
+    try:
+        from ..services.deploy import invalidate_deploy_config_cache
+        from ..services.logger import logger as _service_logger
+
+        invalidate_deploy_config_cache()
+        _service_logger.invalidate()
+    except ImportError:
+        pass
+
 
 # ==================== 适配器抽象接口 ====================
 
 
-class RuntimeAdapter(ABC):
+@runtime_checkable
+class RuntimeAdapter(Protocol):
     """运行时环境抽象适配器
-    
+
     定义核心引擎所需的所有外部能力：
     - 日志系统
     - 配置获取
     - LLM 调用
     - 用户通知
+
+    使用 Protocol（结构化类型）而非 ABC：方法调用无 ABC 的注册/
+    分发开销（log/get_config 属于每迭代热路径），具体适配器
+    显式继承以获得 IDE 约束，但不强制。
     """
 
-    @abstractmethod
     def get_logger(self) -> Any:
         """获取日志器实例
         
@@ -55,7 +98,6 @@ class RuntimeAdapter(ABC):
             日志器对象（支持 info/debug/warning/error/exception 方法）
         """
 
-    @abstractmethod
     def log(self, level: str, message: str, **kwargs: Any) -> None:
         """记录日志
         
@@ -65,11 +107,9 @@ class RuntimeAdapter(ABC):
             **kwargs: 额外数据
         """
 
-    @abstractmethod
     def log_exception(self, message: str) -> None:
         """记录异常（带堆栈）"""
 
-    @abstractmethod
     def get_config(self, key: str, default: Any = None) -> Any:
         """获取配置项
         
@@ -81,11 +121,9 @@ class RuntimeAdapter(ABC):
             配置值
         """
 
-    @abstractmethod
     def get_full_config(self) -> "WebAppConfig":
         """获取完整配置对象"""
 
-    @abstractmethod
     def stream_llm(
         self,
         messages: List[Dict[str, Any]],
@@ -103,7 +141,6 @@ class RuntimeAdapter(ABC):
             文本内容增量
         """
 
-    @abstractmethod
     async def notify_user(self, message: str) -> None:
         """通知用户
         
@@ -114,11 +151,9 @@ class RuntimeAdapter(ABC):
             message: 通知消息
         """
 
-    @abstractmethod
     def get_plugin_data_dir(self) -> str:
         """获取插件数据目录路径"""
 
-    @abstractmethod
     def get_model_info(self, model_group: str) -> Dict[str, Any]:
         """获取模型配置信息
         
@@ -129,6 +164,5 @@ class RuntimeAdapter(ABC):
             包含 api_key, base_url, model, temperature 的字典
         """
 
-    @abstractmethod
     def get_proxy_url(self) -> Optional[str]:
         """获取代理 URL（如果配置了）"""
@@ -6,7 +6,8 @@
 
 from typing import Any, AsyncIterator, Dict, List, Optional
 
-from .adapter import RuntimeAdapter
+from ._llm_stream import aclose_clients, stream_openai_compatible
+from .adapter import RuntimeAdapter, _build_log_dispatch
 
 
 class NekroAdapter(RuntimeAdapter):
@@ -28,12 +29,18 @@ class NekroAdapter(RuntimeAdapter):
         """
         self._plugin_data_dir = plugin_data_dir
         self._model_group = model_group
-        
+
         # 延迟初始化
         self._logger: Any = None
         self._core_config: Any = None
         self._notify_callback: Optional[Any] = None
 
+        # level -> 已绑定日志方法（随 _ensure_imports 一并构建）
+        self._log_dispatch: Dict[str, Any] = {}
+
+        # get_full_config 的快照缓存（插件配置会话内视为不变）
+        self._full_config_cache: Optional[Dict[str, Any]] = None
+
     def _ensure_imports(self) -> None:
         """确保 nekro-agent 模块已导入"""
         if self._logger is None:
@@ -41,6 +48,7 @@ class NekroAdapter(RuntimeAdapter):
             from nekro_agent.core.logger import logger
             self._logger = logger
             self._core_config = config
+            self._log_dispatch = _build_log_dispatch(logger)
 
     def set_notify_callback(self, callback: Any) -> None:
         """设置通知回调（用于 AsyncTaskHandle.notify_agent）"""
@@ -52,8 +60,7 @@ class NekroAdapter(RuntimeAdapter):
 
     def log(self, level: str, message: str, **kwargs: Any) -> None:  # noqa: ARG002
         self._ensure_imports()
-        log_func = getattr(self._logger, level.lower(), self._logger.info)
-        log_func(message)
+        self._log_dispatch.get(level, self._logger.info)(message)
 
     def log_exception(self, message: str) -> None:
         self._ensure_imports()
@@ -64,16 +71,22 @@ class NekroAdapter(RuntimeAdapter):
         return getattr(self._core_config, key, default)
 
     def get_full_config(self) -> Any:
-        """返回兼容的配置对象"""
-        from ..plugin import config as plugin_config
-        
-        return {
-            "model": self._model_group,
-            "worker_url": plugin_config.WORKER_URL,
-            "access_key": plugin_config.ACCESS_KEY,
-            "max_iterations": plugin_config.MAX_ITERATIONS,
-            "task_timeout_minutes": plugin_config.TASK_TIMEOUT_MINUTES,
-        }
+        """返回兼容的配置对象
+
+        快照在首次访问时构建并缓存：插件配置在一次会话内不变，
+        没必要每次访问都重走 Pydantic 属性链重建字典。
+        """
+        if self._full_config_cache is None:
+            from ..plugin import config as plugin_config
+
+            self._full_config_cache = {
+                "model": self._model_group,
+                "worker_url": plugin_config.WORKER_URL,
+                "access_key": plugin_config.ACCESS_KEY,
+                "max_iterations": plugin_config.MAX_ITERATIONS,
+                "task_timeout_minutes": plugin_config.TASK_TIMEOUT_MINUTES,
+            }
+        return self._full_config_cache
 
     async def stream_llm(
         self,
@@ -81,42 +94,30 @@ class NekroAdapter(RuntimeAdapter):
         model: str,
         temperature: Optional[float] = None,
     ) -> AsyncIterator[str]:
-        """使用 nekro-agent 的模型配置进行流式调用"""
+        """使用 nekro-agent 的模型配置进行流式调用（委托到共享热路径 _llm_stream）"""
         self._ensure_imports()
-        
+
         model_group = model or self._model_group
         model_info = self._core_config.get_model_group_info(model_group)
-        
-        # 使用适配后的流式客户端
-        import httpx
-        from openai import AsyncOpenAI
-        
-        http_client = httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=30, read=300, write=300, pool=30),
-        )
-        
+
+        api_key = model_info.API_KEY.strip() if model_info.API_KEY else None
+
         try:
-            async with AsyncOpenAI(
-                api_key=model_info.API_KEY.strip() if model_info.API_KEY else None,
+            async for content in stream_openai_compatible(
+                api_key=api_key,
                 base_url=model_info.BASE_URL,
-                http_client=http_client,
-            ) as client:
-                stream = await client.chat.completions.create(
-                    model=model_info.CHAT_MODEL,
-                    messages=messages,  # type: ignore[arg-type]
-                    temperature=temperature or model_info.TEMPERATURE,
-                    stream=True,
-                )
-
-                async for chunk in stream:
-                    if chunk.choices and chunk.choices[0].delta.content:
-                        yield chunk.choices[0].delta.content
-
+                model=model_info.CHAT_MODEL,
+                messages=messages,
+                temperature=temperature or model_info.TEMPERATURE,
+            ):
+                yield content
         except Exception:
             self._logger.exception("LLM 调用异常")
             raise
-        finally:
-            await http_client.aclose()
+
+    async def aclose(self) -> None:
+        """关闭所有缓存的客户端连接"""
+        await aclose_clients()
 
     async def notify_user(self, message: str) -> None:
         """通过回调通知用户"""
@@ -7,15 +7,24 @@
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
 
-import httpx
-from loguru import logger
-from openai import AsyncOpenAI
-
-from .adapter import RuntimeAdapter
+from ._llm_stream import aclose_clients, stream_openai_compatible
+from .adapter import RuntimeAdapter, _build_log_dispatch
 
 if TYPE_CHECKING:
     from ..cli.config.settings import WebAppConfig
 
+# loguru/httpx/openai 均延迟导入：nekro-agent 插件模式下本模块
+# 会被 import 但 StandaloneAdapter 从不实例化，不应支付这些开销
+_loguru_logger: Any = None
+
+
+def _get_logger() -> Any:
+    global _loguru_logger
+    if _loguru_logger is None:
+        from loguru import logger
+        _loguru_logger = logger
+    return _loguru_logger
+
 
 class StandaloneAdapter(RuntimeAdapter):
     """独立 CLI 模式适配器
@@ -29,24 +38,29 @@ class StandaloneAdapter(RuntimeAdapter):
 
     def __init__(self, config: "WebAppConfig"):
         """初始化适配器
-        
+
         Args:
             config: WebApp 配置对象
         """
         self._config = config
         self._data_dir: Optional[Path] = None
 
+        # level -> 已绑定日志方法，首次记录时构建
+        # 避免每条日志的 str.lower() 分配和 getattr 查找
+        self._log_dispatch: Optional[Dict[str, Any]] = None
+
     def get_logger(self) -> Any:
-        return logger
+        return _get_logger()
 
     def log(self, level: str, message: str, **kwargs: Any) -> None:
-        log_func = getattr(logger, level.lower(), logger.info)
+        if self._log_dispatch is None:
+            self._log_dispatch = _build_log_dispatch(_get_logger())
         if kwargs:
             message = f"{message} | {kwargs}"
-        log_func(message)
+        self._log_dispatch.get(level, self._log_dispatch["info"])(message)
 
     def log_exception(self, message: str) -> None:
-        logger.exception(message)
+        _get_logger().exception(message)
 
     def get_config(self, key: str, default: Any = None) -> Any:
         return getattr(self._config, key, default)
@@ -69,37 +83,24 @@ class StandaloneAdapter(RuntimeAdapter):
         model: str,
         temperature: Optional[float] = None,
     ) -> AsyncIterator[str]:
-        """实际的流式调用实现"""
-        proxy_url = self.get_proxy_url()
-        
-        # 创建 HTTP 客户端
-        http_client = httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=30, read=300, write=300, pool=30),
-            proxies={"http://": proxy_url, "https://": proxy_url} if proxy_url else None,
-        )
-
+        """实际的流式调用实现（委托到共享热路径 _llm_stream）"""
         try:
-            async with AsyncOpenAI(
+            async for content in stream_openai_compatible(
                 api_key=self._config.openai_api_key,
                 base_url=self._config.openai_base_url,
-                http_client=http_client,
-            ) as client:
-                stream = await client.chat.completions.create(
-                    model=model or self._config.model,
-                    messages=messages,  # type: ignore[arg-type]
-                    temperature=temperature or self._config.temperature,
-                    stream=True,
-                )
-
-                async for chunk in stream:
-                    if chunk.choices and chunk.choices[0].delta.content:
-                        yield chunk.choices[0].delta.content
-
+                model=model or self._config.model,
+                messages=messages,
+                temperature=temperature or self._config.temperature,
+                proxy_url=self.get_proxy_url(),
+            ):
+                yield content
         except Exception as e:
-            logger.exception(f"LLM 调用异常: {e}")
+            _get_logger().exception(f"LLM 调用异常: {e}")
             raise
-        finally:
-            await http_client.aclose()
+
+    async def aclose(self) -> None:
+        """关闭所有缓存的客户端连接"""
+        await aclose_clients()
 
     async def notify_user(self, message: str) -> None:
         """通过事件流通知用户"""
@@ -109,7 +110,7 @@ class StandaloneAdapter(RuntimeAdapter):
             await task_stream.emit_notification(message)
         except ImportError:
             # 如果事件流不可用，直接打印
-            logger.info(f"[通知] {message}")
+            _get_logger().info(f"[通知] {message}")
 
     def get_plugin_data_dir(self) -> str:
         """获取插件数据目录"""
@@ -1,20 +1,62 @@
 import asyncio
-import json
+import hashlib
 import os
-import subprocess
+from collections import OrderedDict
+
+import orjson
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple
 
 from . import node_manager
+from .compiler_pool import compile_env, get_compiler_pool
 from .logger import logger
 
 if TYPE_CHECKING:
     from .task_tracer import TaskTracer
 
+# ==================== 编译结果缓存 ====================
+# Agent 经常对相同输入重复编译（无效 DIFF 后重跑、迭代间复查），
+# 按内容哈希缓存结果可以完全跳过 Node 调用。
+# 设置环境变量 NEKRO_WEBAPP_COMPILE_CACHE=off 可禁用（调试用）。
+
+_CACHE_MAX_ENTRIES = 32
+_CACHE_MISS = object()
+
+_compile_cache: "OrderedDict[bytes, Tuple[bool, str, List[str]]]" = OrderedDict()
+_check_cache: "OrderedDict[bytes, Optional[str]]" = OrderedDict()
+
+
+def _cache_enabled() -> bool:
+    return os.environ.get("NEKRO_WEBAPP_COMPILE_CACHE", "").lower() not in ("off", "0", "false")
+
+
+def _cache_key(files: Mapping[str, str], env_vars: Optional[Dict[str, str]], skip_type_check: bool = False) -> bytes:
+    # files 可能是 VFS 的只读视图（mappingproxy），default=dict 兜底序列化
+    payload = orjson.dumps(
+        {"f": files, "e": env_vars or {}, "s": skip_type_check},
+        option=orjson.OPT_SORT_KEYS,
+        default=dict,
+    )
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def _cache_get(cache: "OrderedDict[bytes, Any]", key: bytes) -> Any:
+    if key not in cache:
+        return _CACHE_MISS
+    cache.move_to_end(key)
+    return cache[key]
+
+
+def _cache_put(cache: "OrderedDict[bytes, Any]", key: bytes, value: Any) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > _CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+
 
 
 async def compile_project(
-    files: Dict[str, str],
+    files: Mapping[str, str],
     tracer: "TaskTracer",
     env_vars: Optional[Dict[str, str]] = None,
     agent_id: str = "UNKNOWN",
@@ -35,7 +77,15 @@ async def compile_project(
         (success, output_code, external_imports)
     """
     try:
-        # 0. 获取 Node 环境 (支持自动下载)
+        # 0. 命中缓存直接返回（编译器对相同输入是确定性的）
+        cache_key: Optional[bytes] = None
+        if _cache_enabled():
+            cache_key = _cache_key(files, env_vars, skip_type_check)
+            cached = _cache_get(_compile_cache, cache_key)
+            if cached is not _CACHE_MISS:
+                return cached
+
+        # 0.5. 获取 Node 环境 (支持自动下载)
         try:
             node_path = await node_manager.get_node_executable(tracer, agent_id)
         except RuntimeError as e:
@@ -49,76 +99,155 @@ async def compile_project(
         if not script_path.exists():
             return False, f"Compiler script not found at {script_path}", []
 
-        # 1.5. 执行类型检查 (TypeScript Strict Check)
+        # 2. 类型检查与 bundle 构建并行执行：类型检查通过是常态，
+        # 串行等检查结束再构建会把两段 Node 调用的墙钟时间叠加。
+        # 检查失败时取消构建任务，结果以类型检查为准。
         if not skip_type_check:
-            type_check_error = await check_project(files, tracer, env_vars, agent_id)
+            check_task = asyncio.create_task(check_project(files, tracer, env_vars, agent_id))
+            build_task = asyncio.create_task(
+                _run_build(files, tracer, env_vars, agent_id, node_path, script_path),
+            )
+            try:
+                type_check_error = await check_task
+            except BaseException:
+                build_task.cancel()
+                await asyncio.gather(build_task, return_exceptions=True)
+                raise
+
             if type_check_error:
                 # 如果类型检查失败，直接返回错误，不需要继续构建 bundle
                 # 这能捕获如 undefined variables, missing imports 等关键错误
-                return False, f"Type Check Failed:\n{type_check_error}", []
+                build_task.cancel()
+                await asyncio.gather(build_task, return_exceptions=True)
+                outcome = (False, f"Type Check Failed:\n{type_check_error}", [])
+                if cache_key is not None:
+                    _cache_put(_compile_cache, cache_key, outcome)
+                return outcome
+
+            outcome = await build_task
+        else:
+            outcome = await _run_build(files, tracer, env_vars, agent_id, node_path, script_path)
+
+        # 基础设施错误（崩溃/空输出等）以 _BuildInfraError 提前抛出，不会进缓存
+        if cache_key is not None:
+            _cache_put(_compile_cache, cache_key, outcome)
+        return outcome
+
+    except _BuildInfraError as e:
+        return False, str(e), []
+    except Exception as e:
+        tracer.log_event(tracer.EVENT.COMPILER_EXCEPTION, agent_id, f"Compilation exception: {e}")
+        return False, str(e), []
+
+
+class _BuildInfraError(Exception):
+    """编译器基础设施错误（进程崩溃/输出异常），结果不具确定性，不可缓存"""
+
+
+async def _pipe_subprocess(process: "asyncio.subprocess.Process", input_bytes: bytes) -> Tuple[bytes, bytes]:
+    """向子进程写入 stdin 并并发读取 stdout/stderr
+
+    对比 communicate()：省掉其内部的二次缓冲，stdin 写入与
+    stdout/stderr 排空同子进程的执行重叠进行；被取消时负责
+    杀掉子进程避免泄漏。
+    """
+    if process.stdin is None or process.stdout is None or process.stderr is None:
+        raise RuntimeError("Subprocess pipes are not available")
 
-        # 2. 调用 Node 进程
-        input_payload = {
-            "files": files,
-            "env_vars": env_vars or {},
-        }
-        input_data = json.dumps(input_payload)
+    stdout_task = asyncio.create_task(process.stdout.read())
+    stderr_task = asyncio.create_task(process.stderr.read())
+    try:
+        process.stdin.write(input_bytes)
+        await process.stdin.drain()
+        process.stdin.close()
+        stdout_bytes = await stdout_task
+        stderr_bytes = await stderr_task
+        await process.wait()
+    except asyncio.CancelledError:
+        process.kill()
+        stdout_task.cancel()
+        stderr_task.cancel()
+        await asyncio.gather(stdout_task, stderr_task, return_exceptions=True)
+        raise
+    return stdout_bytes, stderr_bytes
 
-        # 准备环境变量，确保 PATH 包含 node 所在目录
-        # 否则 esbuild 内部 spawn worker 时会因为找不到 node 而报错 (spawn node ENOENT)
-        env = os.environ.copy()
-        node_dir = str(Path(node_path).parent)
-        env["PATH"] = f"{node_dir}{os.pathsep}{env.get('PATH', '')}"
 
-        # 确保 V8 使用 UTF-8
-        env["LANG"] = "en_US.UTF-8"
+async def _run_build(
+    files: Mapping[str, str],
+    tracer: "TaskTracer",
+    env_vars: Optional[Dict[str, str]],
+    agent_id: str,
+    node_path: str,
+    script_path: Path,
+) -> Tuple[bool, str, List[str]]:
+    """执行 bundle 构建（优先常驻 Worker，失败回退一次性子进程）"""
+    input_payload = {
+        "files": files,
+        "env_vars": env_vars or {},
+    }
+    result: Optional[Dict[str, Any]] = None
+    pool = get_compiler_pool()
+    if pool.available():
+        try:
+            result = await pool.request({"op": "compile", **input_payload}, node_path, lane="compile")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Compiler worker unavailable, falling back to one-shot build: {e}")
+
+    # 回退：一次性 Node 子进程
+    if result is None:
+        # orjson 直接产出 UTF-8 bytes，免去 json.dumps + encode 的两次拷贝
+        input_bytes = orjson.dumps(input_payload, default=dict)
 
         process = await asyncio.create_subprocess_exec(
-            node_path, 
+            node_path,
             str(script_path),
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            cwd=str(compiler_dir),
-            env=env,
+            cwd=str(script_path.parent),
+            env=compile_env(node_path),
         )
 
-        stdout_bytes, stderr_bytes = await process.communicate(input=input_data.encode())
-        
-        stdout = stdout_bytes.decode()
-        stderr = stderr_bytes.decode()
+        stdout_bytes, stderr_bytes = await _pipe_subprocess(process, input_bytes)
 
         if process.returncode != 0:
+            stderr = stderr_bytes.decode()
             tracer.log_event(tracer.EVENT.COMPILER_CRASH, agent_id, f"Local compiler crashed: {stderr}")
-            return False, f"Compiler crashed: {stderr}", []
+            raise _BuildInfraError(f"Compiler crashed: {stderr}")
 
-        # 3. 解析结果
-        if not stdout.strip():
-            return False, f"Empty output from compiler. Stderr: {stderr}", []
+        # 解析结果（直接解析 bytes，错误分支才 decode 成 str）
+        if not stdout_bytes.strip():
+            raise _BuildInfraError(f"Empty output from compiler. Stderr: {stderr_bytes.decode()}")
 
         try:
-            result = json.loads(stdout)
-        except json.JSONDecodeError:
+            result = orjson.loads(stdout_bytes)
+        except orjson.JSONDecodeError:
+            stdout = stdout_bytes.decode()
             tracer.log_event(tracer.EVENT.COMPILER_JSON_ERR, agent_id, f"Invalid JSON from compiler: {stdout}")
-            return False, f"Compiler internal error (Invalid JSON): {stdout[:200]}...", []
+            raise _BuildInfraError(f"Compiler internal error (Invalid JSON): {stdout[:200]}...") from None
 
-        externals = result.get("externals", [])
-        if result.get("success"):
-            return True, result.get("output", ""), externals
-        return False, result.get("error", "Unknown error"), externals
-
-    except Exception as e:
-        tracer.log_event(tracer.EVENT.COMPILER_EXCEPTION, agent_id, f"Compilation exception: {e}")
-        return False, str(e), []
+    externals = result.get("externals", [])
+    if result.get("success"):
+        return True, result.get("output", ""), externals
+    return False, result.get("error", "Unknown error"), externals
 
 
 async def check_project(
-    files: Dict[str, str],
+    files: Mapping[str, str],
     tracer: "TaskTracer",
     env_vars: Optional[Dict[str, str]] = None,
     agent_id: str = "UNKNOWN",
 ) -> Optional[str]:
     """Run strict type checking on the project."""
+    cache_key: Optional[bytes] = None
+    if _cache_enabled():
+        cache_key = _cache_key(files, env_vars)
+        cached = _cache_get(_check_cache, cache_key)
+        if cached is not _CACHE_MISS:
+            return cached
+
     try:
         node_path = await node_manager.get_node_executable(tracer, agent_id)
     except RuntimeError:
@@ -133,46 +262,53 @@ async def check_project(
         return None
 
     # Prepare input
-    input_data = {
+    input_payload = {
         "files": files,
         "env_vars": env_vars or {},
     }
-    input_json = json.dumps(input_data)
 
     try:
-        # 准备环境变量 (Path injection)
-        env = os.environ.copy()
-        node_dir = str(Path(node_path).parent)
-        env["PATH"] = f"{node_dir}{os.pathsep}{env.get('PATH', '')}"
-        
-        process = await asyncio.create_subprocess_exec(
-            node_path,
-            str(check_script),
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=str(compiler_dir),
-            env=env,
-        )
-        
-        stdout_bytes, stderr_bytes = await process.communicate(input=input_json.encode())
-        stdout = stdout_bytes.decode()
+        # 优先走常驻 Worker
+        result: Optional[Dict[str, Any]] = None
+        pool = get_compiler_pool()
+        if pool.available():
+            try:
+                result = await pool.request({"op": "check", **input_payload}, node_path, lane="check")
+            except Exception as e:
+                logger.warning(f"Compiler worker unavailable, falling back to one-shot check: {e}")
 
-        try:
-            result = json.loads(stdout)
-        except json.JSONDecodeError:
-            # If stdout is empty, maybe stderr has info?
-            if not stdout.strip():
-                # check stderr
-                return None  # Fail silently or return error?
-            return f"Validator Error (Invalid JSON): {stdout[:100]}"
+        # 回退：一次性 Node 子进程
+        if result is None:
+            input_bytes = orjson.dumps(input_payload, default=dict)
+
+            process = await asyncio.create_subprocess_exec(
+                node_path,
+                str(check_script),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=str(compiler_dir),
+                env=compile_env(node_path),
+            )
 
-        if result and not result.get("success"):
-            return result.get("error")
+            stdout_bytes, stderr_bytes = await _pipe_subprocess(process, input_bytes)
+
+            try:
+                result = orjson.loads(stdout_bytes)
+            except orjson.JSONDecodeError:
+                # If stdout is empty, maybe stderr has info?
+                if not stdout_bytes.strip():
+                    # check stderr
+                    return None  # Fail silently or return error?
+                return f"Validator Error (Invalid JSON): {stdout_bytes.decode()[:100]}"
+
+        outcome = result.get("error") if result and not result.get("success") else None
 
     except Exception as e:
         logger.warning(f"Validation check failed to run: {e}")
         return None
     else:
-        return None
+        if cache_key is not None:
+            _cache_put(_check_cache, cache_key, outcome)
+        return outcome
 
@@ -0,0 +1,157 @@
+"""常驻 Node 编译 Worker 池
+
+每次编译/类型检查都冷启动一个 Node 进程（V8 + esbuild-wasm 初始化）
+开销在百毫秒级。这里改为长期持有 server.js Worker 进程，
+通过 stdin/stdout 上的长度前缀帧复用它。
+
+线协议（与 local_compiler/server.js 对应）：
+    "<payload字节数>\\n" + payload(JSON)
+
+按 lane（如 "compile" / "check"）各持有一个 Worker：同一 lane 内
+由 asyncio.Lock 串行化（响应顺序天然与请求顺序一致），不同 lane
+可以真正并行。Worker 异常退出时丢弃进程，下次请求自动重启；
+调用方可在失败时回退到一次性子进程。
+"""
+
+import asyncio
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import orjson
+
+_COMPILER_DIR = Path(__file__).parent / "local_compiler"
+_SERVER_SCRIPT = _COMPILER_DIR / "server.js"
+
+
+@lru_cache(maxsize=4)
+def compile_env(node_path: str) -> Dict[str, str]:
+    """构建 Node 子进程的环境变量（按 node 路径缓存）
+
+    os.environ 在会话内不变，没必要每次编译都整份拷贝再重拼 PATH。
+    PATH 前置 node 所在目录：esbuild 内部 spawn worker 需要能找到
+    node，否则报 spawn node ENOENT；LANG 确保 V8 使用 UTF-8。
+    """
+    env = os.environ.copy()
+    node_dir = str(Path(node_path).parent)
+    env["PATH"] = f"{node_dir}{os.pathsep}{env.get('PATH', '')}"
+    env["LANG"] = "en_US.UTF-8"
+    return env
+
+
+class _Worker:
+    """单个懒启动的 server.js 进程，同一时刻只有一个请求在途"""
+
+    def __init__(self) -> None:
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+
+    async def request(self, payload: Dict[str, Any], node_path: str) -> Dict[str, Any]:
+        async with self._lock:
+            await self._ensure_process(node_path)
+            try:
+                return await self._roundtrip(payload)
+            except BaseException:
+                # 包括 CancelledError：请求中途被取消会让协议帧失去对齐，
+                # 只能丢弃当前进程（相当于对 Node 进程 SIGKILL）
+                await self._shutdown_locked()
+                raise
+
+    async def _ensure_process(self, node_path: str) -> None:
+        if self._process is not None and self._process.returncode is None:
+            return
+
+        self._process = None
+
+        self._process = await asyncio.create_subprocess_exec(
+            node_path,
+            str(_SERVER_SCRIPT),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            # stderr 不读取；若接 PIPE 而不消费，缓冲区写满会卡死 Worker
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=str(_COMPILER_DIR),
+            env=compile_env(node_path),
+        )
+
+        # 健康检查：确认帧协议可用再放行业务请求
+        try:
+            pong = await asyncio.wait_for(self._roundtrip({"op": "ping"}), timeout=15)
+        except BaseException:
+            await self._shutdown_locked()
+            raise
+        if not pong.get("success"):
+            await self._shutdown_locked()
+            raise RuntimeError(f"Compiler worker health check failed: {pong}")
+
+    async def _roundtrip(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        process = self._process
+        if process is None or process.stdin is None or process.stdout is None:
+            raise RuntimeError("Compiler worker is not running")
+
+        # payload 中的 files 可能是 VFS 的只读视图（mappingproxy）
+        data = orjson.dumps(payload, default=dict)
+        process.stdin.write(f"{len(data)}\n".encode() + data)
+        await process.stdin.drain()
+
+        header = await process.stdout.readline()
+        if not header:
+            raise RuntimeError(f"Compiler worker closed stdout (exit code: {process.returncode})")
+        body = await process.stdout.readexactly(int(header))
+        return orjson.loads(body)
+
+    async def _shutdown_locked(self) -> None:
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            process.kill()
+            try:
+                await asyncio.shield(process.wait())
+            except Exception:
+                pass
+
+    async def aclose(self) -> None:
+        async with self._lock:
+            await self._shutdown_locked()
+
+
+class CompilerPool:
+    """按 lane 管理 Worker 进程的池"""
+
+    def __init__(self) -> None:
+        self._workers: Dict[str, _Worker] = {}
+
+    @staticmethod
+    def available() -> bool:
+        """Worker 脚本是否存在（不存在时调用方应走一次性子进程）"""
+        return _SERVER_SCRIPT.exists()
+
+    async def request(
+        self,
+        payload: Dict[str, Any],
+        node_path: str,
+        lane: str = "default",
+    ) -> Dict[str, Any]:
+        """在指定 lane 上发送一个请求帧并等待响应帧
+
+        Worker 不存在或已退出时自动（重）启动。任何 I/O 异常都会
+        杀掉该 lane 的 Worker 并向上抛出，由调用方决定是否回退。
+        """
+        worker = self._workers.get(lane)
+        if worker is None:
+            worker = self._workers.setdefault(lane, _Worker())
+        return await worker.request(payload, node_path)
+
+    async def aclose(self) -> None:
+        """终止所有 Worker 进程（幂等）"""
+        workers, self._workers = self._workers, {}
+        for worker in workers.values():
+            await worker.aclose()
+
+
+_pool = CompilerPool()
+
+
+def get_compiler_pool() -> CompilerPool:
+    """获取全局 Worker 池"""
+    return _pool
@@ -7,20 +7,111 @@
 from typing import Dict, List, Tuple
 
 import httpx
+import orjson
 from openai import AsyncOpenAI
+from pydantic import BaseModel
 
+from .deploy import get_http_client
 from .logger import logger
+from .resolver_cache import get_resolver_cache
+
+# aiohttp 传输为可选依赖（openai[aiohttp]）：其连接池对并发请求的
+# 调度明显优于 httpx，可用时优先；缺失时退回共享 httpx 客户端
+try:
+    import aiohttp
+    from openai import DefaultAioHttpClient
+
+    _AIOHTTP_AVAILABLE = True
+except ImportError:
+    _AIOHTTP_AVAILABLE = False
+
+# (base_url, api_key) -> (AsyncOpenAI, 是否独占底层 http 客户端)
+# 按端点+凭据复用连接池（aiohttp 的 TCPConnector 重建成本高）：
+# 指向同一端点的不同模型组共享客户端，凭据变更则自然换新
+_resolver_clients: Dict[Tuple[str, str], Tuple[AsyncOpenAI, bool]] = {}
+
+
+def _get_resolver_client(model_info: Dict[str, str]) -> AsyncOpenAI:
+    """获取缓存的解析用 LLM 客户端（按端点+密钥复用）"""
+    key = (model_info["base_url"] or "", model_info["api_key"] or "")
+    cached = _resolver_clients.get(key)
+    if cached is None:
+        if _AIOHTTP_AVAILABLE:
+            # DefaultAioHttpClient 是 httpx.AsyncClient 的子类（仅替换底层
+            # 传输），timeout 必须用 httpx 形式而非 aiohttp.ClientTimeout
+            http_client = DefaultAioHttpClient(
+                timeout=httpx.Timeout(60.0, connect=30.0),
+            )
+            owns_http = True
+        else:
+            http_client = get_http_client()
+            owns_http = False
+        cached = (
+            AsyncOpenAI(
+                api_key=model_info["api_key"],
+                base_url=model_info["base_url"],
+                http_client=http_client,
+            ),
+            owns_http,
+        )
+        _resolver_clients[key] = cached
+    return cached[0]
+
+
+async def aclose_resolver_clients() -> None:
+    """关闭缓存的解析客户端（共享 httpx 客户端由 deploy 模块负责关闭）"""
+    global _resolver_clients
+    clients, _resolver_clients = _resolver_clients, {}
+    for client, owns_http in clients.values():
+        if owns_http:
+            await client.close()
+
+
+class ResolveResponse(BaseModel):
+    """解析响应的 JSON Schema（约束模型输出为 {"resolved": {pkg: url}}）"""
+
+    resolved: Dict[str, str]
+
+
+# 提示词的静态指令段（变量包列表拼在末尾，见 resolve_missing_dependencies）
+_RESOLVER_PROMPT_HEADER = """你是一个专业的前端工程师。我需要为给定的 npm 包生成 esm.sh CDN URL。
+
+请为每个包返回其 esm.sh URL。规则：
+1. 使用最新稳定版本
+2. 如果包依赖 react/react-dom，添加 `?external=react,react-dom`
+3. 如果包有其他 peer dependencies，也要添加到 external 参数
+4. 如果某个包不存在或不确定，跳过它
+
+输出 JSON 对象，resolved 字段为包名到 URL 的映射：
+{"resolved": {"package-name": "https://esm.sh/package-name@version"}}
+
+不确定的包直接从 resolved 中省略。"""
+
+# json_schema 约束输出：模型只能返回符合 schema 的 JSON，
+# 不再需要容错的逐行文本解析。
+# 注意不能开 strict：resolved 是开放键映射（additionalProperties
+# 为 string 类型），OpenAI 严格模式要求 additionalProperties: false，
+# 带 strict 的请求会被直接 400 拒绝
+_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "resolve",
+        "schema": ResolveResponse.model_json_schema(),
+    },
+}
 
 
 async def resolve_missing_dependencies(
     missing_packages: List[str],
     model_group: str = "fast",
+    cache: bool = True,
 ) -> Tuple[Dict[str, str], List[str]]:
     """使用 AI 解析缺失的依赖包
 
     Args:
         missing_packages: 缺失的包名列表
         model_group: 使用的模型组
+        cache: 是否使用持久化缓存（False 时强制重新解析）
 
     Returns:
         (resolved_imports, unresolved_packages) - 成功解析的映射和无法解析的包列表
@@ -28,24 +119,35 @@ async def resolve_missing_dependencies(
     if not missing_packages:
         return {}, []
 
-    logger.info(f"[DependencyResolver] 开始动态解析依赖: {missing_packages}")
-
-    # 构建 AI 提示
-    prompt = f"""你是一个专业的前端工程师。我需要为以下 npm 包生成 esm.sh CDN URL。
-
-包列表:
-{chr(10).join(f"- {pkg}" for pkg in missing_packages)}
-
-请为每个包返回其 esm.sh URL。规则：
-1. 使用最新稳定版本
-2. 如果包依赖 react/react-dom，添加 `?external=react,react-dom`
-3. 如果包有其他 peer dependencies，也要添加到 external 参数
-4. 如果某个包不存在或不确定，跳过它
+    # 先查持久化缓存：命中的包不再进 LLM 请求；负缓存未过期的
+    # 直接记为未解析，避免重复失败消耗 token
+    cached_resolved: Dict[str, str] = {}
+    cached_failed: List[str] = []
+    resolver_cache = get_resolver_cache() if cache else None
+    if resolver_cache is not None:
+        try:
+            cached_resolved, cached_failed = await resolver_cache.get_many(
+                model_group, missing_packages,
+            )
+        except Exception as e:
+            logger.warning(f"[DependencyResolver] 缓存查询失败，跳过: {e}")
+        else:
+            if cached_resolved:
+                logger.info(f"[DependencyResolver] 缓存命中: {list(cached_resolved)}")
+            missing_packages = [
+                pkg for pkg in missing_packages
+                if pkg not in cached_resolved and pkg not in cached_failed
+            ]
+            if not missing_packages:
+                return cached_resolved, cached_failed
 
-输出格式（每行一个，冒号分隔，包名和URL之间只有一个冒号和空格）：
-package-name: https://esm.sh/package-name@version
+    logger.info(f"[DependencyResolver] 开始动态解析依赖: {missing_packages}")
 
-只输出 URL 映射，不要任何解释。不确定的包直接跳过不输出。"""
+    # 静态指令在前、变量包列表在后：提示词的绝大部分 token 跨调用
+    # 不变，前缀缓存（prompt_cache_key）可以跳过静态段的 prefill
+    prompt = _RESOLVER_PROMPT_HEADER + "\n\n包列表:\n" + "\n".join(
+        f"- {pkg}" for pkg in missing_packages
+    )
 
     try:
         # 通过运行时适配器获取模型配置
@@ -53,48 +155,26 @@ package-name: https://esm.sh/package-name@version
         adapter = get_adapter()
         model_info = adapter.get_model_info(model_group)
 
-        http_client = httpx.AsyncClient(
-            timeout=httpx.Timeout(connect=30, read=60, write=60, pool=30),
+        client = _get_resolver_client(model_info)
+        response = await client.chat.completions.create(
+            model=model_info["model"],
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=500,
+            response_format=_RESPONSE_FORMAT,  # type: ignore[arg-type]
+            extra_body={"prompt_cache_key": "resolve_missing_deps_v1"},
         )
 
-        try:
-            async with AsyncOpenAI(
-                api_key=model_info["api_key"],
-                base_url=model_info["base_url"],
-                http_client=http_client,
-            ) as client:
-                response = await client.chat.completions.create(
-                    model=model_info["model"],
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.2,
-                    max_tokens=500,
-                )
-
-                if not response.choices or not response.choices[0].message.content:
-                    logger.warning("[DependencyResolver] AI 返回空响应")
-                    return {}, missing_packages
-
-                result_text = response.choices[0].message.content.strip()
-        finally:
-            await http_client.aclose()
-
-        # 解析响应
-        resolved: Dict[str, str] = {}
-        for line in result_text.split("\n"):
-            line = line.strip()
-            if not line or ":" not in line:
-                continue
-
-            # 分割包名和 URL（只按第一个冒号分割，因为 URL 中也有冒号）
-            parts = line.split(":", 1)
-            if len(parts) != 2:
-                continue
+        if not response.choices or not response.choices[0].message.content:
+            logger.warning("[DependencyResolver] AI 返回空响应")
+            return cached_resolved, cached_failed + missing_packages
 
-            pkg_name = parts[0].strip()
-            url = parts[1].strip()
+        result_text = response.choices[0].message.content.strip()
 
-            # 验证 URL 格式
-            if not url.startswith("https://esm.sh/"):
+        # 解析响应（schema 已约束结构，二次校验作为纵深防御）
+        resolved: Dict[str, str] = {}
+        for pkg_name, url in orjson.loads(result_text).get("resolved", {}).items():
+            if not isinstance(url, str) or not url.startswith("https://esm.sh/"):
                 logger.warning(f"[DependencyResolver] 无效 URL 格式: {url}")
                 continue
 
@@ -113,9 +193,16 @@ package-name: https://esm.sh/package-name@version
         else:
             logger.info(f"[DependencyResolver] 成功解析 {len(resolved)} 个包")
 
+        # 回写缓存（失败结果做短 TTL 负缓存）
+        if resolver_cache is not None:
+            try:
+                await resolver_cache.put_many(model_group, resolved, unresolved)
+            except Exception as e:
+                logger.warning(f"[DependencyResolver] 缓存写入失败，跳过: {e}")
+
     except Exception as e:
         logger.exception(f"[DependencyResolver] 动态解析失败: {e}")
-        return {}, missing_packages
+        return cached_resolved, cached_failed + missing_packages
 
     else:
-        return resolved, unresolved
+        return {**cached_resolved, **resolved}, cached_failed + unresolved
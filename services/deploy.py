@@ -5,12 +5,51 @@
 """
 
 import asyncio
+import random
+import re
 from typing import Dict, Optional
 
 import httpx
 from ..models import CreatePageRequest, CreatePageResponse
 from .logger import logger
 
+# 模块级共享客户端：部署重试、健康检查与依赖解析复用同一个连接池，
+# 重试时直接走保活的 TLS 连接，省掉每次请求的 TCP+TLS 握手
+_client: Optional[httpx.AsyncClient] = None
+
+# HTTP/2 支持为可选依赖（httpx[http2]）：Worker 走 ALPN 自动协商，
+# 多路复用让并发的部署和健康检查共享一条连接；h2 缺失时退回 HTTP/1.1
+try:
+    import h2  # noqa: F401
+
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取懒初始化的共享 HTTP 客户端"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(connect=None, read=60, write=60, pool=None),
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=100,
+                keepalive_expiry=60,
+            ),
+        )
+    return _client
+
+
+async def aclose_http_client() -> None:
+    """关闭共享客户端（插件生命周期结束时调用，幂等）"""
+    global _client
+    client, _client = _client, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
 
 async def _emit_deploy_event(url: str) -> None:
     try:
@@ -20,31 +59,56 @@ async def _emit_deploy_event(url: str) -> None:
         pass
 
 
+# 部署配置快照：适配器配置在会话内不变，缓存成功的查询结果，
+# 让重试热循环和健康检查免去每次的适配器分发；失败（适配器未
+# 初始化等）不缓存，以便适配器就绪后能重新读取
+_cached_deploy_config: Optional[tuple[Optional[str], Optional[str]]] = None
+
+
 def _get_deploy_config() -> tuple[Optional[str], Optional[str]]:
     """获取部署配置（worker_url, access_key）
-    
+
     通过运行时适配器获取，支持 CLI 和插件两种模式。
     """
+    global _cached_deploy_config
+    if _cached_deploy_config is not None:
+        return _cached_deploy_config
+
     try:
         from ..runtime import get_adapter
         adapter = get_adapter()
         config = adapter.get_full_config()
-        
+
         # CLI 模式：config 是 WebAppConfig 对象
         if hasattr(config, "worker_url"):
-            return config.worker_url, config.access_key
+            _cached_deploy_config = (config.worker_url, config.access_key)
+            return _cached_deploy_config
         # 插件模式：config 可能是字典
         if isinstance(config, dict):
-            return config.get("worker_url"), config.get("access_key")
+            _cached_deploy_config = (config.get("worker_url"), config.get("access_key"))
+            return _cached_deploy_config
     except (ImportError, RuntimeError):
         pass
-    
+
     return None, None
 
 
+def invalidate_deploy_config_cache() -> None:
+    """清除部署配置快照（配置或适配器变更后调用）"""
+    global _cached_deploy_config
+    _cached_deploy_config = None
+
+
+# {{key}} 占位符；一次 re.sub 遍历替换所有变量，
+# 避免每个变量对整份 HTML 做一遍 str.replace 全量拷贝
+_TEMPLATE_RE = re.compile(r"\{\{(\w+)\}\}")
+
+
 def render_template_vars(html_content: str, template_vars: Dict[str, str]) -> str:
     """渲染模板变量，替换 {{key}} 占位符
 
+    未知的占位符保持原样（与逐个 replace 的旧行为一致）。
+
     Args:
         html_content: 原始 HTML 内容
         template_vars: 模板变量字典
@@ -52,11 +116,12 @@ def render_template_vars(html_content: str, template_vars: Dict[str, str]) -> st
     Returns:
         替换后的 HTML 内容
     """
-    result = html_content
-    for key, value in template_vars.items():
-        placeholder = "{{" + key + "}}"
-        result = result.replace(placeholder, value)
-    return result
+    if not template_vars:
+        return html_content
+    return _TEMPLATE_RE.sub(
+        lambda m: template_vars.get(m.group(1), m.group(0)),
+        html_content,
+    )
 
 
 async def deploy_html_to_worker(
@@ -112,23 +177,41 @@ async def deploy_html_to_worker(
     base_delay = 1.0
 
     for attempt in range(max_retries):
+        # 默认按指数退避；加随机抖动避免并发部署的重试在同一时刻
+        # 对齐（惊群）
+        delay = base_delay * (2**attempt) * random.uniform(0.5, 1.5)  # noqa: S311
+
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    api_url,
-                    json=request_data.model_dump(),
-                    headers={
-                        "Authorization": f"Bearer {access_key}",
-                    },
+            client = get_http_client()
+            response = await client.post(
+                api_url,
+                json=request_data.model_dump(),
+                headers={
+                    "Authorization": f"Bearer {access_key}",
+                },
+                timeout=60.0,
+            )
+
+            if response.status_code in (200, 201):
+                data = response.json()
+                result = CreatePageResponse.model_validate(data)
+                logger.info(f"部署成功: {result.url}")
+                await _emit_deploy_event(result.url)
+                return result.url
+
+            if response.status_code in (429, 503):
+                # 服务端限流/过载：优先尊重 Retry-After，别在恢复前再砸一轮
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.replace(".", "", 1).isdigit():
+                    delay = float(retry_after) * random.uniform(0.75, 1.25)  # noqa: S311
+                logger.warning(
+                    f"部署尝试 {attempt + 1}/{max_retries} 被限流: HTTP {response.status_code}",
                 )
-
-                if response.status_code in (200, 201):
-                    data = response.json()
-                    result = CreatePageResponse.model_validate(data)
-                    logger.info(f"部署成功: {result.url}")
-                    await _emit_deploy_event(result.url)
-                    return result.url
-
+            elif 400 <= response.status_code < 500:
+                # 其他 4xx（如鉴权失败）是永久性错误，重试只会浪费三次尝试
+                logger.error(f"部署失败（不可重试）: HTTP {response.status_code}, {response.text}")
+                return None
+            else:
                 logger.warning(
                     f"部署尝试 {attempt + 1}/{max_retries} 失败: HTTP {response.status_code}, {response.text}",
                 )
@@ -140,8 +223,7 @@ async def deploy_html_to_worker(
 
         # 如果不是最后一次尝试，等待后重试
         if attempt < max_retries - 1:
-            delay = base_delay * (2**attempt)
-            logger.info(f"等待 {delay}秒后重试...")
+            logger.info(f"等待 {delay:.1f}秒后重试...")
             await asyncio.sleep(delay)
 
     logger.error("部署最终失败")
@@ -163,8 +245,7 @@ async def check_worker_health() -> bool:
     health_url = f"{worker_url}/health"
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(health_url)
-            return response.status_code == 200
+        response = await get_http_client().get(health_url, timeout=10.0)
+        return response.status_code == 200
     except Exception:
         return False
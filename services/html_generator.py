@@ -4,9 +4,12 @@
 包含依赖注入、动态 Import Map 生成等功能。
 """
 
-import json
 import re
-from typing import Dict, List, Optional
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import orjson
 
 # 核心依赖 (始终包含)
 CORE_IMPORTS = {
@@ -55,9 +58,65 @@ OPTIONAL_IMPORTS = {
 }
 
 
+# 核心 + 可选依赖的合并视图，在导入期构建一次；两张表都是模块常量，
+# 不需要每次请求重新合并
+_ALL_KNOWN_IMPORTS = {**CORE_IMPORTS, **OPTIONAL_IMPORTS}
+
+# 匹配编译产物中的 import 说明符：
+# from "pkg" / import("pkg") / import ... "pkg"
+_IMPORT_SPEC_RE = re.compile(
+    r"""from\s+["']([^"']+)["']|import\s*\(\s*["']([^"']+)["']|import\s+[^"']*["']([^"']+)["']""",
+)
+
+# esm.sh URL 的 external= 参数（可能被 & 截断）
+_EXTERNAL_RE = re.compile(r"external=([^&]+)")
+
+# Shell HTML 的静态骨架：逐段常量 + 一次 join，不必每次请求重排
+# 整个模板；基础样式压缩成单行，顺带减小上传到 Worker 的体积
+_SHELL_HEAD_PRE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>"""
+_SHELL_HEAD_MID = """</title>
+    <style>html,body,#root{width:100%;height:100%;margin:0;padding:0}</style>
+    """
+_SHELL_IMPORTMAP_PRE = """
+    <script type="importmap">
+    """
+_SHELL_MODULE_PRE = """
+    </script>
+    <script type="module">
+"""
+_SHELL_TAIL = """
+    </script>
+</head>
+<body>
+    <div id="root"></div>
+</body>
+</html>
+"""
+
+
+@lru_cache(maxsize=256)
+def extract_external_deps(esm_url: str) -> Tuple[str, ...]:
+    """从 esm.sh URL 提取 external 参数中的依赖列表
+
+    例如: "external=react,react-dom,leaflet" -> ("react", "react-dom", "leaflet")
+
+    OPTIONAL_IMPORTS 里的同一批 URL 会在每次请求中反复解析，
+    按 URL 记忆化（返回元组以便缓存）。
+    """
+    match = _EXTERNAL_RE.search(esm_url)
+    if match:
+        return tuple(dep.strip() for dep in match.group(1).split(",") if dep.strip())
+    return ()
+
+
 def get_all_known_imports() -> Dict[str, str]:
     """获取所有已知的依赖映射（核心 + 可选）"""
-    return {**CORE_IMPORTS, **OPTIONAL_IMPORTS}
+    return dict(_ALL_KNOWN_IMPORTS)
 
 
 def validate_externals(externals: List[str]) -> tuple[bool, List[str]]:
@@ -69,8 +128,7 @@ def validate_externals(externals: List[str]) -> tuple[bool, List[str]]:
     Returns:
         (is_valid, missing_packages) - 是否全部有效，缺失的包列表
     """
-    all_known = get_all_known_imports()
-    missing = [pkg for pkg in externals if pkg not in all_known]
+    missing = [pkg for pkg in externals if pkg not in _ALL_KNOWN_IMPORTS]
     return len(missing) == 0, missing
 
 
@@ -121,78 +179,40 @@ def generate_shell_html(
     # 合并所有可用的依赖源（静态配置 + 动态解析）
     scannable_imports = {**OPTIONAL_IMPORTS, **(extra_imports or {})}
 
-    # 扫描代码特征和依赖声明
-    # 简单的启发式搜索: 检查所有可用依赖的 key 是否出现在 body_js 中
-    # 或者是否在 dependencies 列表中
-    for pkg_name, url in scannable_imports.items():
-        # 1. 显式声明
-        if pkg_name in dependencies:
-            final_imports[pkg_name] = url
-            continue
+    # 扫描代码中的依赖引用：先用单次正则提取所有 import 说明符，
+    # 再做哈希查找——避免对每个已知包做一遍 body_js 全文子串扫描
+    # 注意: body_js 是编译后的代码，esbuild 对于 external 模块会保留 import "pkg_name"
+    imported_specs = {m for tup in _IMPORT_SPEC_RE.findall(body_js) for m in tup if m}
 
-        # 2. 代码引用检测 (简单字符串匹配)
-        # 例如: import { Canvas } from "@react-three/fiber" -> 包含 "@react-three/fiber"
-        # 或者 import * as THREE from "three"
-        # 注意: body_js 是编译后的代码，esbuild 对于 external 模块会保留 import "pkg_name"
-        if f'"{pkg_name}"' in body_js or f"'{pkg_name}'" in body_js:
+    for pkg_name, url in scannable_imports.items():
+        # 1. 显式声明  2. 代码引用检测
+        if pkg_name in dependencies or pkg_name in imported_specs:
             final_imports[pkg_name] = url
 
-    # 自动解析隐式依赖：从 esm.sh URL 的 external= 参数提取依赖链
-    # 例如: "external=react,react-dom,leaflet" -> 需要确保这些包也在 import map 中
-    def extract_external_deps(esm_url: str) -> List[str]:
-        """从 esm.sh URL 提取 external 参数中的依赖列表"""
-        if "external=" not in esm_url:
-            return []
-        # 提取 external= 后的包列表 (可能被 & 截断)
-        match = re.search(r"external=([^&]+)", esm_url)
-        if match:
-            return [dep.strip() for dep in match.group(1).split(",") if dep.strip()]
-        return []
-
-    # 遍历已添加的包，解析其 external 依赖并补充到 import map
-    added_deps = True
+    # 遍历已添加的包，解析其 external 依赖并补充到 import map。
+    # BFS：每个包只在首次进入 final_imports 时入队一次，单趟遍历
+    # 依赖图即可覆盖所有传递依赖
     # 合并静态配置和动态解析的依赖
-    all_imports = {**CORE_IMPORTS, **OPTIONAL_IMPORTS, **(extra_imports or {})}
-    
-    processed_deps = set()
-    
-    while added_deps:  # 循环直到没有新依赖被添加（处理传递依赖）
-        added_deps = False
-        current_imports = list(final_imports.items())
-        
-        for pkg_name, url in current_imports:
-            if pkg_name in processed_deps:
-                continue
-            
-            processed_deps.add(pkg_name)
-            
-            for dep in extract_external_deps(url):
-                if dep not in final_imports and dep in all_imports:
-                    final_imports[dep] = all_imports[dep]
-                    added_deps = True
+    all_imports = {**_ALL_KNOWN_IMPORTS, **extra_imports} if extra_imports else _ALL_KNOWN_IMPORTS
+
+    queue = deque(final_imports.keys())
+    while queue:
+        pkg_name = queue.popleft()
+        for dep in extract_external_deps(final_imports[pkg_name]):
+            if dep not in final_imports and dep in all_imports:
+                final_imports[dep] = all_imports[dep]
+                queue.append(dep)
 
     import_map = {"imports": final_imports}
 
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title or "WebApp"}</title>
-    <style>
-      /* Base styles to prevent white flash */
-      html, body, #root {{ width: 100%; height: 100%; margin: 0; padding: 0; }}
-    </style>
-    {scripts_html}
-    <script type="importmap">
-    {json.dumps(import_map, indent=4)}
-    </script>
-    <script type="module">
-{body_js}
-    </script>
-</head>
-<body>
-    <div id="root"></div>
-</body>
-</html>
-"""
+    return "".join([
+        _SHELL_HEAD_PRE,
+        title or "WebApp",
+        _SHELL_HEAD_MID,
+        scripts_html,
+        _SHELL_IMPORTMAP_PRE,
+        orjson.dumps(import_map, option=orjson.OPT_INDENT_2).decode("utf-8"),
+        _SHELL_MODULE_PRE,
+        body_js,
+        _SHELL_TAIL,
+    ])
@@ -0,0 +1,325 @@
+// 常驻编译 Worker
+//
+// 由 services/compiler_pool.py 启动并长期持有，避免每次编译/类型检查
+// 重新冷启动 Node + V8 + esbuild。
+//
+// 线协议（stdin/stdout 对称）：
+//   "<payload字节数>\n" + payload(JSON)
+// 请求: { op: "compile" | "check" | "ping", files, env_vars }
+// 响应: { success, output?, error?, externals? }
+// 同一时刻只有一个请求在途（Python 侧串行化）。
+
+const fs = require('fs');
+const path = require('path');
+const os = require('os');
+const { exec } = require('child_process');
+const esbuild = require('./lib/main.js');
+
+function getLoader(filename) {
+    const ext = path.extname(filename);
+    switch (ext) {
+        case '.js': return 'jsx'; // 允许 js 中写 jsx
+        case '.jsx': return 'jsx';
+        case '.ts': return 'ts';
+        case '.tsx': return 'tsx';
+        case '.css': return 'css';
+        case '.json': return 'json';
+        default: return 'text';
+    }
+}
+
+// ==================== compile (esbuild bundle) ====================
+
+async function runCompile(files, env_vars) {
+    const collectedExternals = [];
+
+    const virtualFsPlugin = {
+        name: 'virtual-fs',
+        setup(build) {
+            build.onResolve({ filter: /.*/ }, args => {
+                if (args.kind === 'entry-point') {
+                    return { path: args.path, namespace: 'vfs' };
+                }
+                if (args.path.startsWith('/')) {
+                    return { path: args.path.substring(1), namespace: 'vfs' };
+                }
+                if (args.path.startsWith('@/')) {
+                    const aliasPath = 'src/' + args.path.substring(2);
+                    return { path: aliasPath, namespace: 'vfs' };
+                }
+                if (args.path.startsWith('.')) {
+                    const dir = path.dirname(args.importer);
+                    const resolved = path.join(dir, args.path);
+                    const cleanPath = resolved.startsWith('/') ? resolved.substring(1) : resolved;
+                    return { path: cleanPath, namespace: 'vfs' };
+                }
+                if (args.path.endsWith('.css')) {
+                    return { path: args.path, namespace: 'ignore-css' };
+                }
+                collectedExternals.push(args.path);
+                return { path: args.path, external: true };
+            });
+
+            build.onLoad({ filter: /.*/, namespace: 'ignore-css' }, () => {
+                return { contents: '', loader: 'css' };
+            });
+
+            build.onLoad({ filter: /.*/, namespace: 'vfs' }, args => {
+                const content = files[args.path];
+                if (!content) {
+                    const extensions = ['.tsx', '.ts', '.jsx', '.js', '.css', '.json'];
+                    for (const ext of extensions) {
+                        if (files[args.path + ext]) {
+                            return {
+                                contents: files[args.path + ext],
+                                loader: getLoader(args.path + ext)
+                            };
+                        }
+                    }
+                    return { errors: [{ text: `File not found in VFS: ${args.path}` }] };
+                }
+                return {
+                    contents: content,
+                    loader: getLoader(args.path)
+                };
+            });
+        }
+    };
+
+    try {
+        const result = await esbuild.build({
+            entryPoints: ['src/main.tsx'],
+            bundle: true,
+            format: 'esm',
+            target: ['es2020'],
+            outfile: 'bundle.js',
+            plugins: [virtualFsPlugin],
+            jsx: 'automatic',
+            write: false,
+            external: ['react', 'react-dom', 'react-dom/client'],
+            define: {
+                'process.env.NODE_ENV': '"development"',
+                ...Object.fromEntries(
+                    Object.entries(env_vars || {}).map(([k, v]) => [
+                        `process.env.${k}`,
+                        JSON.stringify(v)
+                    ])
+                )
+            }
+        });
+
+        let jsCode = '';
+        let cssCode = '';
+        for (const file of result.outputFiles) {
+            if (file.path.endsWith('.js')) {
+                jsCode = file.text;
+            } else if (file.path.endsWith('.css')) {
+                cssCode = file.text;
+            }
+        }
+
+        if (cssCode) {
+            const escapedCss = JSON.stringify(cssCode);
+            const injectScript = `
+(function() {
+    try {
+        const style = document.createElement('style');
+        style.textContent = ${escapedCss};
+        document.head.appendChild(style);
+    } catch(e) {
+        console.error('Failed to inject CSS:', e);
+    }
+})();
+`;
+            jsCode = injectScript + jsCode;
+        }
+
+        return {
+            success: true,
+            output: jsCode,
+            externals: [...new Set(collectedExternals)]
+        };
+    } catch (e) {
+        let errorMsg = e.message;
+        if (e.errors && e.errors.length > 0) {
+            errorMsg = e.errors.map(err => {
+                let text = err.text;
+                if (err.location) {
+                    text += ` at ${err.location.file}:${err.location.line}:${err.location.column}`;
+                    text += `\n${err.location.lineText}\n${'^'.padStart(err.location.column + 1, ' ')}`;
+                }
+                return text;
+            }).join('\n\n');
+        }
+        return { success: false, error: errorMsg };
+    }
+}
+
+// ==================== check (tsc strict check) ====================
+
+function runCheck(files) {
+    return new Promise(resolve => {
+        let tmpDir = null;
+        try {
+            tmpDir = fs.mkdtempSync(path.join(os.tmpdir(), 'nekro-check-'));
+
+            for (const [filepath, content] of Object.entries(files)) {
+                const fullPath = path.join(tmpDir, filepath);
+                const dir = path.dirname(fullPath);
+                fs.mkdirSync(dir, { recursive: true });
+                fs.writeFileSync(fullPath, content);
+            }
+
+            const tsconfig = {
+                "compilerOptions": {
+                    "target": "ES2020",
+                    "useDefineForClassFields": true,
+                    "lib": ["ES2020", "DOM", "DOM.Iterable"],
+                    "module": "ESNext",
+                    "skipLibCheck": true,
+                    "moduleResolution": "bundler",
+                    "allowImportingTsExtensions": true,
+                    "resolveJsonModule": true,
+                    "isolatedModules": true,
+                    "noEmit": true,
+                    "jsx": "react-jsx",
+                    "strict": true,
+                    "noImplicitAny": false,
+                    "noUnusedLocals": false,
+                    "noUnusedParameters": false,
+                    "noFallthroughCasesInSwitch": true,
+                    "allowJs": true,
+                    "checkJs": false
+                },
+                "include": ["src"]
+            };
+            fs.writeFileSync(path.join(tmpDir, 'tsconfig.json'), JSON.stringify(tsconfig, null, 2));
+
+            let tscPath = path.resolve(__dirname, 'node_modules/.bin/tsc');
+            if (!fs.existsSync(tscPath)) {
+                const directPath = path.resolve(__dirname, 'node_modules/typescript/bin/tsc');
+                if (fs.existsSync(directPath)) {
+                    tscPath = directPath;
+                } else {
+                    try { fs.rmSync(tmpDir, { recursive: true, force: true }); } catch (_) {}
+                    resolve({
+                        success: true,
+                        output: "Warning: TypeScript compiler (tsc) not found in local_compiler. Skipping strict type check."
+                    });
+                    return;
+                }
+            }
+
+            try {
+                fs.symlinkSync(path.join(__dirname, 'node_modules'), path.join(tmpDir, 'node_modules'));
+            } catch (e) {
+                // Ignore if symlink fails
+            }
+
+            exec(`node "${tscPath}" -p . --noEmit --pretty false`, { cwd: tmpDir, maxBuffer: 1024 * 1024 * 5 }, (error, stdout, stderr) => {
+                try {
+                    fs.rmSync(tmpDir, { recursive: true, force: true });
+                } catch (e) {}
+
+                if (!error) {
+                    resolve({ success: true, output: "No errors found." });
+                    return;
+                }
+
+                const rawOutput = stdout || stderr || error.message;
+
+                let cleanedOutput = rawOutput.split('\n')
+                    .filter(line => {
+                        if (!line.trim()) return false;
+                        // 环境中未安装第三方包的类型，忽略相关误报
+                        if (line.includes('error TS2307:')) return false;
+                        if (line.includes('error TS7016:')) return false;
+                        return true;
+                    })
+                    .map(line => {
+                        if (tmpDir && line.includes(tmpDir)) {
+                            return line.replace(tmpDir, 'vfs:');
+                        }
+                        return line;
+                    })
+                    .join('\n');
+
+                if (!cleanedOutput.trim()) {
+                    resolve({ success: true, output: "No critical errors found (ignored missing modules)." });
+                    return;
+                }
+
+                if (cleanedOutput.length > 2000) {
+                    cleanedOutput = cleanedOutput.substring(0, 2000) + "\n... (Status: Truncated due to length)";
+                }
+
+                resolve({ success: false, error: cleanedOutput, raw: rawOutput });
+            });
+        } catch (e) {
+            if (tmpDir) {
+                try { fs.rmSync(tmpDir, { recursive: true, force: true }); } catch (_) {}
+            }
+            resolve({ success: false, error: e.message });
+        }
+    });
+}
+
+// ==================== 帧协议主循环 ====================
+
+function send(obj) {
+    const data = Buffer.from(JSON.stringify(obj));
+    process.stdout.write(data.length + "\n");
+    process.stdout.write(data);
+}
+
+async function handle(request) {
+    try {
+        switch (request.op) {
+            case 'ping':
+                send({ success: true, output: 'pong' });
+                break;
+            case 'compile':
+                send(await runCompile(request.files || {}, request.env_vars || {}));
+                break;
+            case 'check':
+                send(await runCheck(request.files || {}));
+                break;
+            default:
+                send({ success: false, error: `Unknown op: ${request.op}` });
+        }
+    } catch (e) {
+        send({ success: false, error: e.message });
+    }
+}
+
+let buffer = Buffer.alloc(0);
+let processing = Promise.resolve();
+
+process.stdin.on('data', chunk => {
+    buffer = Buffer.concat([buffer, chunk]);
+    while (true) {
+        const nl = buffer.indexOf(10); // '\n'
+        if (nl === -1) return;
+        const len = parseInt(buffer.slice(0, nl).toString(), 10);
+        if (isNaN(len) || len < 0) {
+            process.exit(1);
+        }
+        if (buffer.length < nl + 1 + len) return;
+        const payload = buffer.slice(nl + 1, nl + 1 + len);
+        buffer = buffer.slice(nl + 1 + len);
+
+        let request;
+        try {
+            request = JSON.parse(payload.toString());
+        } catch (e) {
+            send({ success: false, error: `Invalid frame: ${e.message}` });
+            continue;
+        }
+        // 串行处理，保证响应顺序与请求顺序一致
+        processing = processing.then(() => handle(request));
+    }
+});
+
+process.stdin.on('end', () => {
+    process.exit(0);
+});
@@ -18,10 +18,27 @@ def get_logger() -> Any:
 
 
 class _LoggerProxy:
-    """Logger 代理，延迟获取实际的 logger"""
-    
+    """Logger 代理，延迟获取实际的 logger
+
+    首次访问后缓存解析结果：每条日志不再重走 get_adapter() 的
+    异常处理和分发链，代价与直接持有 loguru 相同。适配器变更时
+    由 set_adapter() 调用 invalidate() 重新解析。
+    """
+
+    __slots__ = ("_real",)
+
+    def __init__(self) -> None:
+        self._real: Any = None
+
+    def invalidate(self) -> None:
+        """清除缓存的 logger（适配器变更后调用）"""
+        self._real = None
+
     def __getattr__(self, name: str) -> Any:
-        return getattr(get_logger(), name)
+        real = self._real
+        if real is None:
+            real = self._real = get_logger()
+        return getattr(real, name)
 
 
 logger: Any = _LoggerProxy()
@@ -6,6 +6,7 @@ import subprocess
 import sys
 import tarfile
 import urllib.request
+from functools import lru_cache
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Optional, Tuple
 
@@ -22,19 +23,24 @@ _CACHED_NODE_PATH: Optional[str] = None
 _INIT_LOCK = asyncio.Lock()
 
 
-def _get_node_dist_name(tracer: "TaskTracer", agent_id: str = "UNKNOWN") -> str:
-    """Detect appropriate Node.js distribution for current platform"""
+@lru_cache(maxsize=1)
+def _detect_dist_name() -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Detect the Node.js distribution for the current platform.
+
+    Pure function of the (process-stable) platform, so computed once.
+    Returns (dist_name, warnings) where warnings are (event_name, message)
+    pairs for the caller to log — keeping this cacheable without a tracer.
+    """
     system = platform.system().lower()
     machine = platform.machine().lower()
+    warnings = []
 
-    if system == "linux":
-        os_name = "linux"
-    elif system == "darwin":
-        os_name = "darwin"
+    if system in ("linux", "darwin"):
+        os_name = system
     else:
         # Fallback to linux if unknown (e.g. running in wsl but reporting funny?)
         # Or raise error if strict. For plugins, best effort.
-        tracer.log_event(tracer.EVENT.NODE_UNKNOWN_SYS, agent_id, f"Unknown system '{system}', defaulting to linux")
+        warnings.append(("NODE_UNKNOWN_SYS", f"Unknown system '{system}', defaulting to linux"))
         os_name = "linux"
 
     if machine in ("x86_64", "amd64"):
@@ -42,10 +48,18 @@ def _get_node_dist_name(tracer: "TaskTracer", agent_id: str = "UNKNOWN") -> str:
     elif machine in ("aarch64", "arm64"):
         arch = "arm64"
     else:
-        tracer.log_event(tracer.EVENT.NODE_UNKNOWN_ARCH, agent_id, f"Unknown architecture '{machine}', defaulting to x64")
+        warnings.append(("NODE_UNKNOWN_ARCH", f"Unknown architecture '{machine}', defaulting to x64"))
         arch = "x64"
 
-    return f"node-{NODE_VERSION}-{os_name}-{arch}"
+    return f"node-{NODE_VERSION}-{os_name}-{arch}", tuple(warnings)
+
+
+def _get_node_dist_name(tracer: "TaskTracer", agent_id: str = "UNKNOWN") -> str:
+    """Detect appropriate Node.js distribution for current platform"""
+    dist_name, warnings = _detect_dist_name()
+    for event_name, message in warnings:
+        tracer.log_event(getattr(tracer.EVENT, event_name), agent_id, message)
+    return dist_name
 
 
 def _get_system_node() -> Optional[str]:
@@ -81,27 +95,39 @@ async def _download_and_extract_node(target_dir: Path, tracer: "TaskTracer", age
 
     tracer.log_event(tracer.EVENT.NODE_DOWNLOAD, agent_id, f"Downloading Node.js {NODE_VERSION} ({dist_name})...")
 
-    tar_path = target_dir / f"{dist_name}.tar.xz"
     extract_temp = target_dir / "temp_extract"
 
     target_dir.mkdir(parents=True, exist_ok=True)
 
     try:
-        # Download
-        # Use run_in_executor for blocking IO
+        # Stream the HTTP body straight into the tar reader ("r|xz" pipe mode
+        # needs no seeks), so extraction happens as bytes arrive and the
+        # tarball never touches disk. When system tar+xz are available, pipe
+        # into them instead: xz decompresses multi-threaded (XZ_DEFAULTS=-T 0)
+        # while Python's lzma is single-threaded. Blocking IO -> run_in_executor.
         loop = asyncio.get_running_loop()
-        await loop.run_in_executor(
-            None,
-            lambda: urllib.request.urlretrieve(download_url, tar_path),
-        )
-
-        tracer.log_event(tracer.EVENT.NODE_EXTRACT, agent_id, "Extracting Node.js...")
-
-        def extract():
-            with tarfile.open(tar_path, "r:xz") as tar:
-                tar.extractall(path=extract_temp)
 
-        await loop.run_in_executor(None, extract)
+        def download_and_extract():
+            with urllib.request.urlopen(download_url, timeout=300) as resp:
+                if shutil.which("tar") and shutil.which("xz"):
+                    extract_temp.mkdir(parents=True, exist_ok=True)
+                    proc = subprocess.Popen(
+                        ["tar", "-xJf", "-", "-C", str(extract_temp)],
+                        stdin=subprocess.PIPE,
+                        env={**os.environ, "XZ_DEFAULTS": "-T 0"},
+                    )
+                    try:
+                        shutil.copyfileobj(resp, proc.stdin)
+                        proc.stdin.close()
+                    finally:
+                        returncode = proc.wait()
+                    if returncode != 0:
+                        raise RuntimeError(f"tar extraction exited with code {returncode}")
+                else:
+                    with tarfile.open(fileobj=resp, mode="r|xz") as tar:
+                        tar.extractall(path=extract_temp)
+
+        await loop.run_in_executor(None, download_and_extract)
 
         # Move bin to final location
         # The tar contains a root folder like node-v18.19.0-linux-x64/
@@ -119,15 +145,12 @@ async def _download_and_extract_node(target_dir: Path, tracer: "TaskTracer", age
         shutil.move(str(extracted_root), str(final_dist_dir))
 
         # Cleanup
-        tar_path.unlink()
         shutil.rmtree(extract_temp)
 
         tracer.log_event(tracer.EVENT.NODE_INSTALLED, agent_id, "Node.js installed successfully.")
 
     except Exception as e:
         # Cleanup on failure
-        if tar_path.exists():
-            tar_path.unlink()
         if extract_temp.exists():
             shutil.rmtree(extract_temp)
         if target_dir.exists():
@@ -1,43 +1,50 @@
 """提示词日志保存工具"""
 
-import json
+import asyncio
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Union
 
+_SEP = "=" * 80
+_MSG_SEP = "-" * 80
 
-def save_prompt_log_to_file(
+
+async def save_prompt_log_to_file(
     agent_id: str,
     messages: List[Union[Dict[str, Any], Any]],
     plugin_data_dir: str,
 ) -> str:
     """保存提示词日志到文件
-    
+
+    内容用列表拼接一次 join（避免对多 MB 日志做逐段 += 的平方拷贝），
+    磁盘写入放到线程池，不阻塞事件循环。
+
     Args:
         agent_id: Agent ID
         messages: 消息列表（支持 Dict 或具有 role/content 属性的对象）
         plugin_data_dir: 插件数据目录
-        
+
     Returns:
         保存的日志文件路径
     """
     prompts_dir = Path(plugin_data_dir) / "prompts"
-    prompts_dir.mkdir(parents=True, exist_ok=True)
-    
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{timestamp}_{agent_id}.log"
     log_path = prompts_dir / filename
-    
-    log_content = f"""{'=' * 80}
+
+    parts = [
+        f"""{_SEP}
 提示词日志 - {agent_id}
-{'=' * 80}
+{_SEP}
 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 Agent ID: {agent_id}
 消息数量: {len(messages)}
-{'=' * 80}
+{_SEP}
+
+""",
+    ]
 
-"""
-    
     for i, msg in enumerate(messages, 1):
         # 支持 Dict 和对象两种格式
         if isinstance(msg, dict):
@@ -46,11 +53,13 @@ Agent ID: {agent_id}
         else:
             role = getattr(msg, "role", "unknown")
             content = getattr(msg, "content", "")
-        
-        log_content += f"[{i}] Role: {role}\n"
-        log_content += f"Content:\n{content}\n"
-        log_content += f"{'-' * 80}\n\n"
-    
-    log_path.write_text(log_content, encoding="utf-8")
-    
+
+        parts.append(f"[{i}] Role: {role}\nContent:\n{content}\n{_MSG_SEP}\n\n")
+
+    def write() -> None:
+        prompts_dir.mkdir(parents=True, exist_ok=True)
+        log_path.write_text("".join(parts), encoding="utf-8")
+
+    await asyncio.to_thread(write)
+
     return str(log_path)
@@ -0,0 +1,145 @@
+"""依赖解析结果的持久化缓存
+
+npm 包名到 esm.sh URL 的映射基本是确定性的，且会跨构建反复出现。
+把解析结果落到 SQLite（插件数据目录下），命中时直接跳过一次
+1~5 秒的 LLM 往返。失败结果也做短 TTL 的负缓存，避免同一个
+不存在的包在每次构建时都去打扰模型。
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .logger import logger
+
+# 负缓存（解析失败）的有效期：6 小时后允许重试
+_NEGATIVE_TTL_SECONDS = 6 * 60 * 60
+
+
+class ResolverCache:
+    """包名 -> esm.sh URL 的 SQLite 缓存
+
+    key 为 "model_group:pkg"，url 为 NULL 表示上次解析失败（负缓存）。
+    sqlite3 是同步接口，读写都很快（微秒级），通过 to_thread 包一层
+    避免阻塞事件循环。
+    """
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self._db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._db_path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resolver_cache ("
+                "key TEXT PRIMARY KEY, pkg TEXT, url TEXT, ts INTEGER)",
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _get_many_sync(
+        self,
+        model_group: str,
+        packages: List[str],
+    ) -> Tuple[Dict[str, str], List[str]]:
+        with self._lock:
+            conn = self._get_conn()
+            keys = [f"{model_group}:{pkg}" for pkg in packages]
+            placeholders = ",".join("?" for _ in keys)
+            rows = conn.execute(
+                f"SELECT pkg, url, ts FROM resolver_cache WHERE key IN ({placeholders})",  # noqa: S608
+                keys,
+            ).fetchall()
+
+        now = int(time.time())
+        resolved: Dict[str, str] = {}
+        failed: List[str] = []
+        for pkg, url, ts in rows:
+            if url is not None:
+                resolved[pkg] = url
+            elif now - ts < _NEGATIVE_TTL_SECONDS:
+                failed.append(pkg)
+        return resolved, failed
+
+    def _put_many_sync(
+        self,
+        model_group: str,
+        resolved: Dict[str, str],
+        unresolved: List[str],
+    ) -> None:
+        now = int(time.time())
+        entries = [(f"{model_group}:{pkg}", pkg, url, now) for pkg, url in resolved.items()]
+        entries += [(f"{model_group}:{pkg}", pkg, None, now) for pkg in unresolved]
+        if not entries:
+            return
+        with self._lock:
+            conn = self._get_conn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO resolver_cache (key, pkg, url, ts) VALUES (?, ?, ?, ?)",
+                entries,
+            )
+            conn.commit()
+
+    async def get_many(
+        self,
+        model_group: str,
+        packages: List[str],
+    ) -> Tuple[Dict[str, str], List[str]]:
+        """批量查询缓存
+
+        Returns:
+            (已解析映射, 负缓存未过期的包列表)
+        """
+        return await asyncio.to_thread(self._get_many_sync, model_group, packages)
+
+    async def put_many(
+        self,
+        model_group: str,
+        resolved: Dict[str, str],
+        unresolved: List[str],
+    ) -> None:
+        """批量写入解析结果（unresolved 作为负缓存，带 TTL）"""
+        await asyncio.to_thread(self._put_many_sync, model_group, resolved, unresolved)
+
+    def close(self) -> None:
+        """关闭数据库连接（幂等）"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 模块级单例：数据库路径来自运行时适配器的插件数据目录
+_cache: Optional[ResolverCache] = None
+
+
+def get_resolver_cache() -> Optional[ResolverCache]:
+    """获取解析缓存实例；适配器未初始化时返回 None（跳过缓存）"""
+    global _cache
+    if _cache is None:
+        try:
+            from ..runtime import get_adapter
+
+            data_dir = get_adapter().get_plugin_data_dir()
+        except (ImportError, RuntimeError):
+            return None
+        _cache = ResolverCache(str(Path(data_dir) / "resolver_cache.db"))
+    return _cache
+
+
+def close_resolver_cache() -> None:
+    """关闭缓存数据库连接（插件停用时调用）"""
+    global _cache
+    cache, _cache = _cache, None
+    if cache is not None:
+        try:
+            cache.close()
+        except Exception as e:
+            logger.warning(f"[ResolverCache] 关闭缓存失败: {e}")
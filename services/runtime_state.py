@@ -4,11 +4,17 @@
 """
 
 import time
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional, Set
 
 
-@dataclass
+# 工具调用消息的入口截断上限：编译诊断可能有数 MB，
+# 记录只用于近期历史展示，留全文只会白占内存
+_MAX_MSG = 512
+
+
+@dataclass(slots=True)
 class ToolCallRecord:
     """工具调用记录"""
 
@@ -18,7 +24,7 @@ class ToolCallRecord:
     timestamp: float
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentRuntimeState:
     """Agent 运行时状态"""
 
@@ -35,8 +41,9 @@ class AgentRuntimeState:
     iteration: int = 0
     max_iterations: int = 20
 
-    # 工具调用历史
-    tool_calls: List[ToolCallRecord] = field(default_factory=list)
+    # 工具调用历史（环形缓冲：只用于展示近期记录，
+    # 上限 200 条防止长任务无限累积）
+    tool_calls: Deque[ToolCallRecord] = field(default_factory=lambda: deque(maxlen=200))
 
     # 编译状态
     compile_count: int = 0
@@ -73,12 +80,13 @@ class AgentRuntimeState:
         return base
 
     def add_tool_call(self, name: str, success: bool, message: str) -> None:
-        """添加工具调用记录"""
+        """添加工具调用记录（消息在入口处截断，避免保留整份编译输出）"""
+        truncated = message if len(message) <= _MAX_MSG else message[:_MAX_MSG] + "…"
         self.tool_calls.append(
             ToolCallRecord(
                 name=name,
                 success=success,
-                message=message,
+                message=truncated,
                 timestamp=time.time(),
             ),
         )
@@ -92,7 +100,7 @@ class AgentRuntimeState:
             self.compile_count += 1
             self.last_compile_success = success
             if not success:
-                self.last_compile_error = message[:200]
+                self.last_compile_error = truncated[:200]
 
     # 交互状态
     pending_feedback: Optional[str] = None
@@ -132,6 +140,21 @@ class RuntimeStateManager:
     def __init__(self) -> None:
         if not hasattr(self, "_states"):
             self._states = {}
+            # 辅助索引：按会话查询和"运行中"过滤都是轮询热路径，
+            # 维护索引把查询从全表扫描降到 O(命中数)
+            self._by_chat_key: Dict[str, Set[str]] = defaultdict(set)
+            self._running: Set[str] = set()
+
+    @staticmethod
+    def _key(chat_key: str, task_id: str) -> str:
+        return f"{chat_key}::{task_id}"
+
+    def _set_status(self, key: str, state: AgentRuntimeState, status: str) -> None:
+        state.status = status
+        if status == "running":
+            self._running.add(key)
+        else:
+            self._running.discard(key)
 
     def create_state(
         self,
@@ -141,7 +164,7 @@ class RuntimeStateManager:
         max_iterations: int = 20,
     ) -> AgentRuntimeState:
         """创建新的运行状态"""
-        key = f"{chat_key}::{task_id}"
+        key = self._key(chat_key, task_id)
         state = AgentRuntimeState(
             task_id=task_id,
             chat_key=chat_key,
@@ -150,30 +173,28 @@ class RuntimeStateManager:
             max_iterations=max_iterations,
         )
         self._states[key] = state
+        self._by_chat_key[chat_key].add(key)
         return state
 
     def get_state(self, chat_key: str, task_id: str) -> Optional[AgentRuntimeState]:
         """获取特定任务的运行状态"""
-        key = f"{chat_key}::{task_id}"
-        return self._states.get(key)
+        return self._states.get(self._key(chat_key, task_id))
 
     def get_states_by_chat_key(self, chat_key: str) -> List[AgentRuntimeState]:
         """获取会话下所有任务的运行状态"""
-        prefix = f"{chat_key}::"
-        return [s for k, s in self._states.items() if k.startswith(prefix)]
+        return [self._states[k] for k in self._by_chat_key.get(chat_key, ())]
 
     def update_status(self, chat_key: str, task_id: str, status: str, phase: str) -> None:
         """更新状态"""
-        key = f"{chat_key}::{task_id}"
+        key = self._key(chat_key, task_id)
         state = self._states.get(key)
         if state:
-            state.status = status
+            self._set_status(key, state, status)
             state.current_phase = phase
 
     def update_iteration(self, chat_key: str, task_id: str, iteration: int) -> None:
         """更新迭代次数"""
-        key = f"{chat_key}::{task_id}"
-        state = self._states.get(key)
+        state = self._states.get(self._key(chat_key, task_id))
         if state:
             state.iteration = iteration
 
@@ -186,27 +207,32 @@ class RuntimeStateManager:
         message: str,
     ) -> None:
         """记录工具调用"""
-        key = f"{chat_key}::{task_id}"
-        state = self._states.get(key)
+        state = self._states.get(self._key(chat_key, task_id))
         if state:
             state.add_tool_call(name, success, message)
 
     def complete(self, chat_key: str, task_id: str, success: bool) -> None:
         """标记任务完成"""
-        key = f"{chat_key}::{task_id}"
+        key = self._key(chat_key, task_id)
         state = self._states.get(key)
         if state:
-            state.status = "completed" if success else "failed"
+            self._set_status(key, state, "completed" if success else "failed")
             state.current_phase = "已完成" if success else "失败"
 
     def remove_state(self, chat_key: str, task_id: str) -> None:
         """移除状态"""
-        key = f"{chat_key}::{task_id}"
-        self._states.pop(key, None)
+        key = self._key(chat_key, task_id)
+        if self._states.pop(key, None) is not None:
+            self._running.discard(key)
+            chat_keys = self._by_chat_key.get(chat_key)
+            if chat_keys is not None:
+                chat_keys.discard(key)
+                if not chat_keys:
+                    del self._by_chat_key[chat_key]
 
     def get_all_running(self) -> List[AgentRuntimeState]:
         """获取所有运行中的任务"""
-        return [s for s in self._states.values() if s.status == "running"]
+        return [self._states[k] for k in self._running]
 
 
 # 全局实例
@@ -4,21 +4,65 @@
 生成自包含的分析提示文档。
 """
 
-import json
 import logging
 import os
+import re
 import shutil
+import struct
+import sys
 import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
+import orjson
+
 from .logger import logger
 
 if TYPE_CHECKING:
     from .vfs import ProjectContext
 
+# 日志分隔线，模块加载时构建一次
+_SEP80 = "=" * 80
+
+# 日志级别名 -> 数值的查表，省掉每个事件的 upper()+getattr 组合
+_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
+# update_summary 用到的替换模式，预编译避免每次 finalize 重复编译
+_RE_STATUS = re.compile(r"\*\*最终状态\*\*: `[^`]+`")
+
+# 分析文档未渲染时占位文件中的标记
+_PENDING_MARKER = "<!-- FULL_REPORT_PENDING -->"
+
+# 追踪器落盘线程池：VFS 快照和 finalize 的报告写入在此执行，
+# 异步 Agent 的事件循环不再为整段磁盘写入停顿
+_TRACER_IO_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tracer-io")
+
+# 分析提示里展示的关键时间线事件白名单
+_KEY_EVENT_TYPES = frozenset([
+    "TASK_START",
+    "AGENT_CREATED",
+    "REVIEW_START",
+    "REVIEW_RESULT",
+    "FINAL_COMPILE_START",
+    "FINAL_COMPILE_SUCCESS",
+    "FINAL_COMPILE_FAILED",
+    "DEPLOY_START",
+    "DEPLOY_SUCCESS",
+    "DEPLOY_FAILED",
+    "NOTIFICATION_SENT",
+    "TASK_END",
+])
+
 
 class TaskEvent(str, Enum):
     """任务事件类型枚举
@@ -197,6 +241,41 @@ class TaskEvent(str, Enum):
     """依赖解析失败 - 部分依赖无法解析"""
 
 
+# 枚举成员 -> 纯字符串值的映射。str 混入枚举的 f-string 格式化会走
+# Enum.__format__ 产出 "TaskEvent.TASK_START"，热路径上查表取值
+# 既快又得到干净的事件名
+_EVENT_STR: Dict[str, str] = {e: e.value for e in TaskEvent}
+
+
+def _fast_copy(src: str, dst: Path) -> None:
+    """内核态文件复制（不保留 stat/xattr，日志复制不需要原 mtime）
+
+    源和目标都在插件数据目录下（同一文件系统）：优先 copy_file_range
+    （支持 reflink 的文件系统上只更新元数据），其次 sendfile 绕开
+    用户态缓冲；二者不可用或中途失败时退回 shutil.copyfile。
+    """
+    try:
+        with open(src, "rb") as fsrc, dst.open("wb") as fdst:
+            src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+            size = os.fstat(src_fd).st_size
+            offset = 0
+            if hasattr(os, "copy_file_range"):
+                while offset < size:
+                    sent = os.copy_file_range(src_fd, dst_fd, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            while offset < size:
+                sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            if offset < size:
+                raise OSError("内核态复制未完成")
+    except (OSError, AttributeError):
+        shutil.copyfile(src, dst)
+
+
 class TaskTracer:
     """任务追踪器
 
@@ -234,20 +313,55 @@ class TaskTracer:
         self.chat_key = chat_key
         self.root_agent_id = root_agent_id
         self.task_description = task_description
+        # start_time（墙钟）只用于人类可读的创建时间；区间计时一律走
+        # perf_counter_ns（整数纳秒），不受 NTP 校时回跳影响，
+        # 后续格式化全程整数运算
         self.start_time = time.time()
+        self._start_perf_ns = time.perf_counter_ns()
         
         # 即使禁用，也初始化基本路径属性以防调用出错，但不创建目录
         self.task_dir = Path(plugin_data_dir) / "tasks" / f"task_{self.task_id}"
         self.log_file = self.task_dir / "01_task_trace.log"
-        self.events: List[Dict[str, Any]] = []
+        # 热路径写入长度前缀的二进制记录；人类可读的 .log 文本
+        # 在 finalize 时由 render_trace_log() 渲染一次
+        self.trace_bin = self.task_dir / "01_task_trace.bin"
         self.prompt_counter = 0
+        # 已落盘的提示词日志文件名（按序号递增，天然有序），
+        # 生成分析提示时直接渲染，免去对 prompts/ 目录的 glob 扫描
+        self._prompt_filenames: List[str] = []
+
+        # 增量维护的统计量：finalize 阶段的元数据/日志尾部/诊断各需一份
+        # 聚合，边记录边累加后这些读取都是 O(1)，不再反复遍历事件列表
+        self._agents_set: set[str] = set()
+        self._event_type_counts: Counter[str] = Counter()
+        self._llm_calls = 0
+        self._event_count = 0
+
+        # 不再整份保留事件字典（metadata 可能引用大对象，长任务下
+        # 无界增长）：完整记录已落在 01_task_trace.bin，内存里只留
+        # 分析提示需要的关键事件摘要，有界 deque 保底
+        self._key_events: deque[tuple[str, str, str, str]] = deque(maxlen=64)
+
+        # 常驻日志句柄（64KB 缓冲）：每个事件只剩一次缓冲写，
+        # 不再为每条记录做 open/append/close 三连系统调用
+        self._log_fh: Optional[Any] = None
+
+        # 预打开的 prompts 目录 fd：提示词日志以相对文件名 openat 写入，
+        # 免去内核对完整路径的逐级解析（小文件 open 的主要开销）
+        self._prompts_dir_fd: Optional[int] = None
 
         if self.enabled:
             # 创建任务目录
             self.task_dir.mkdir(parents=True, exist_ok=True)
             (self.task_dir / "prompts").mkdir(exist_ok=True)
             (self.task_dir / "vfs_snapshot").mkdir(exist_ok=True)
-            
+
+            if os.open in os.supports_dir_fd:
+                self._prompts_dir_fd = os.open(
+                    str(self.task_dir / "prompts"),
+                    os.O_RDONLY | os.O_DIRECTORY,
+                )
+
             # 初始化日志文件
             self._init_log_file()
             logger.info(f"[TaskTracer] 任务追踪器已创建: {self.task_id}")
@@ -255,18 +369,43 @@ class TaskTracer:
             logger.debug(f"[TaskTracer] 任务追踪器已禁用: {self.task_id}")
 
     def _init_log_file(self) -> None:
-        """初始化日志文件头部"""
-        header = f"""{"=" * 80}
-任务追踪日志 - Task {self.task_id}
-{"=" * 80}
-任务 ID: {self.task_id}
-根 Agent: {self.root_agent_id}
-任务描述: {self.task_description}
-创建时间: {datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S")}
-{"=" * 80}
+        """初始化二进制追踪日志并写入头部记录"""
+        self._log_fh = open(self.trace_bin, "wb", buffering=64 * 1024)  # noqa: SIM115
+        header = {
+            "hdr": {
+                "task_id": self.task_id,
+                "root_agent_id": self.root_agent_id,
+                "task_description": self.task_description,
+                "created_at": datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S"),
+            },
+        }
+        self._write_record(orjson.dumps(header), flush=True)
 
-"""
-        self.log_file.open("w", encoding="utf-8").write(header)
+    def _write_prompt_file(self, filename: str, log_path: Path, data: bytes) -> None:
+        """写入提示词日志（优先相对目录 fd openat，退回完整路径）"""
+        if self._prompts_dir_fd is None:
+            log_path.write_bytes(data)
+            return
+        fd = os.open(
+            filename,
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+            0o644,
+            dir_fd=self._prompts_dir_fd,
+        )
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+    def _write_record(self, blob: bytes, flush: bool = False) -> None:
+        """通过常驻句柄写入一条长度前缀的记录（句柄已关闭时回退为追加打开）"""
+        if self._log_fh is None or self._log_fh.closed:
+            self._log_fh = open(self.trace_bin, "ab", buffering=64 * 1024)  # noqa: SIM115
+        self._log_fh.write(struct.pack("<I", len(blob)) + blob)
+        if flush:
+            self._log_fh.flush()
     
     def log_event(
         self,
@@ -292,50 +431,61 @@ class TaskTracer:
         if not self.enabled:
             return
 
-        elapsed = time.time() - self.start_time
-        timestamp = self._format_t_plus(elapsed)
-        
-        # 1. 记录内部数据
-        event = {
-            "timestamp": timestamp,
-            "elapsed_seconds": elapsed,
-            "event_type": event_type,
-            "agent_id": agent_id,
-            "message": message,
-            **metadata,
-        }
-        self.events.append(event)
-        
-        # 2. 直接写入日志文件 (不依赖 Handler)
+        # agent_id 只有少量不同取值：驻留后集合/字典操作走指针比较
+        # 快路径，重复的字符串对象也被去重
+        agent_id = sys.intern(agent_id)
+
+        elapsed_ns = time.perf_counter_ns() - self._start_perf_ns
+        timestamp = self._format_t_plus(elapsed_ns)
+
+        # 查表取纯字符串事件名（枚举成员以其值为哈希键，可直接命中；
+        # 自定义字符串事件原样透传）
+        etype_str = _EVENT_STR.get(event_type, event_type)
+        level_name = level if level in _LEVELS else level.upper()
+
+        # 1. 更新内部统计与关键事件摘要
+        self._event_count += 1
+        self._agents_set.add(agent_id)
+        self._event_type_counts[etype_str] += 1
+        if etype_str == "LLM_CALL_START":
+            self._llm_calls += 1
+        if etype_str in _KEY_EVENT_TYPES:
+            self._key_events.append((timestamp, etype_str, agent_id, message))
+
+        # 2. 直接写入二进制日志 (不依赖 Handler)
         try:
-            with self.log_file.open("a", encoding="utf-8") as f:
-                # === 结构化事件格式 ===
-                # T+00:00:01.123 [EVENT_TYPE] AgentID
-                #   └─ Message
-                #   └─ Key: Value
-                f.write(f"\n{timestamp} [{event_type}] {agent_id}\n")
-                f.write(f"  └─ {message}\n")
-                
-                for key, value in metadata.items():
-                    val_str = str(value)
-                    if len(val_str) > 200: 
-                        val_str = val_str[:200] + "..."
-                    f.write(f"  └─ {key}: {val_str}\n")
+            # 单条 orjson 记录 + 4 字节长度前缀：热路径只做一次序列化
+            # 一次写入，文本视图由 render_trace_log 在 finalize 渲染
+            record: Dict[str, Any] = {
+                "t": elapsed_ns,
+                "e": etype_str,
+                "a": agent_id,
+                "m": message,
+            }
+            if metadata:
+                record["md"] = {
+                    key: (val_str[:200] + "..." if len(val_str) > 200 else val_str)
+                    for key, val_str in ((k, str(v)) for k, v in metadata.items())
+                }
+            # 常规事件走缓冲；WARNING/ERROR 立即落盘，保证崩溃现场可恢复
+            self._write_record(orjson.dumps(record), flush=level_name in ("WARNING", "ERROR"))
         except Exception as e:
             # 文件写入失败不应崩溃，但要记录错误
             logger.error(f"TaskTracer 文件写入失败: {e}")
 
         # 3. 调用标准 Logger (控制台输出)
-        log_level = getattr(logging, level.upper(), logging.INFO)
+        log_level = _LEVELS.get(level_name, logging.INFO)
         # 控制台只显示简洁信息
         logger.log(log_level, f"[{agent_id}] {message}")
 
-    def _format_t_plus(self, seconds: float) -> str:
-        """格式化为 T+HH:MM:SS.mmm"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = seconds % 60
-        return f"T+{hours:02d}:{minutes:02d}:{secs:06.3f}"
+    @staticmethod
+    def _format_t_plus(elapsed_ns: int) -> str:
+        """格式化纳秒间隔为 T+HH:MM:SS.mmm（纯整数 divmod，无浮点运算）"""
+        total_ms = elapsed_ns // 1_000_000
+        total_s, ms = divmod(total_ms, 1000)
+        total_m, s = divmod(total_s, 60)
+        h, m = divmod(total_m, 60)
+        return f"T+{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
 
     def register_prompt_log(
         self,
@@ -383,7 +533,8 @@ class TaskTracer:
 
         # 复制日志文件
         try:
-            shutil.copy2(original_log_path, new_path)
+            _fast_copy(original_log_path, new_path)
+            self._prompt_filenames.append(new_filename)
             logger.debug(f"[TaskTracer] 已复制提示词日志: {new_filename}")
         except Exception as e:
             logger.error(f"[TaskTracer] 复制提示词日志失败: {e}")
@@ -423,50 +574,46 @@ class TaskTracer:
         log_path = self.task_dir / "prompts" / new_filename
         
         try:
-            # 构建日志内容
-            content = f"""{'=' * 80}
+            # 分段收集、末尾一次 join：长对话下避免 += 的 O(N²) 重复拷贝
+            parts: List[str] = [f"""{_SEP80}
 提示词日志 - {agent_id}
-{'=' * 80}
+{_SEP80}
 时间: {now.strftime('%Y-%m-%d %H:%M:%S')}
 Event: LLM Call {self.prompt_counter}
-{'=' * 80}
+{_SEP80}
 
-"""
+"""]
             # 记录请求消息
             for i, msg in enumerate(messages, 1):
                 if isinstance(msg, dict):
                     role = msg.get("role", "unknown")
                     text = msg.get("content", "")
                     if "tool_calls" in msg:
-                        tc = msg["tool_calls"]
-                        tc_json = json.dumps(tc, ensure_ascii=False, indent=2)
+                        tc_json = orjson.dumps(msg["tool_calls"], option=orjson.OPT_INDENT_2).decode("utf-8")
                         text = f"{text}\n\n[Tool Calls]: {tc_json}" if text else f"[Tool Calls]: {tc_json}"
                     if not text:
                         text = str(msg)
                 else:
                     role = getattr(msg, "role", "unknown")
                     text = getattr(msg, "content", str(msg))
-                content += f"[{i}] Role: {role}\n"
-                content += f"Content:\n{text}\n"
-                content += f"{'-' * 80}\n\n"
-            
+                parts.append(f"[{i}] Role: {role}\nContent:\n{text}\n{'-' * 80}\n\n")
+
             # 记录响应
-            content += f"[{len(messages) + 1}] Role: assistant (RESPONSE)\n"
-            
+            parts.append(f"[{len(messages) + 1}] Role: assistant (RESPONSE)\n")
+
             resp_text = ""
             if isinstance(response, dict):
                 resp_text = response.get("content", "") or ""
                 if "tool_calls" in response:
-                    tc = response["tool_calls"]
-                    tc_json = json.dumps(tc, ensure_ascii=False, indent=2)
+                    tc_json = orjson.dumps(response["tool_calls"], option=orjson.OPT_INDENT_2).decode("utf-8")
                     resp_text = f"{resp_text}\n\n[Tool Calls]: {tc_json}" if resp_text else f"[Tool Calls]: {tc_json}"
             else:
                 resp_text = str(response)
-                
-            content += f"Content:\n{resp_text}\n"
-            content += f"{'=' * 80}\n"
 
-            log_path.write_text(content, encoding="utf-8")
+            parts.append(f"Content:\n{resp_text}\n{_SEP80}\n")
+
+            self._write_prompt_file(new_filename, log_path, "".join(parts).encode("utf-8"))
+            self._prompt_filenames.append(new_filename)
             logger.debug(f"[TaskTracer] 已保存提示词日志: {new_filename}")
             
             return str(log_path)
@@ -475,30 +622,51 @@ Event: LLM Call {self.prompt_counter}
             logger.error(f"[TaskTracer] 保存提示词日志失败: {e}")
             return ""
 
-    def save_vfs_snapshot(self, vfs_context: "ProjectContext") -> None:
+    def save_vfs_snapshot(self, vfs_context: "ProjectContext") -> Optional["Future[None]"]:
         """保存 VFS 虚拟文件系统快照
 
+        VFS 读取在调用方线程完成（快照内容与调用时刻一致），
+        磁盘写入提交到落盘线程池，不阻塞调用方。
+
         Args:
             vfs_context: VFS 项目上下文
+
+        Returns:
+            落盘任务的 Future（禁用或读取失败时为 None）
         """
         if not self.enabled:
-            return
+            return None
 
         try:
             all_files = vfs_context.list_files()
+            snapshot_root = self.task_dir / "vfs_snapshot"
 
+            # 先收集内容并去重目录，再统一落盘：每个目录只 mkdir 一次，
+            # 每个文件只剩一次 open+write 系统调用（write_bytes 不经过
+            # TextIOWrapper 的逐块编码缓冲）
+            pending: List[tuple[Path, bytes]] = []
+            parent_dirs = set()
             for file_path in all_files:
                 content = vfs_context.read_file(file_path)
                 if content:
-                    full_path = self.task_dir / "vfs_snapshot" / file_path
-                    full_path.parent.mkdir(parents=True, exist_ok=True)
-
-                    with full_path.open("w", encoding="utf-8") as f:
-                        f.write(content)
-
-            logger.info(f"[TaskTracer] VFS 快照已保存: {len(all_files)} 个文件")
+                    full_path = snapshot_root / file_path
+                    pending.append((full_path, content.encode("utf-8")))
+                    parent_dirs.add(full_path.parent)
         except Exception as e:
             logger.error(f"[TaskTracer] 保存 VFS 快照失败: {e}")
+            return None
+
+        def write_snapshot() -> None:
+            try:
+                for parent in parent_dirs:
+                    parent.mkdir(parents=True, exist_ok=True)
+                for full_path, data in pending:
+                    full_path.write_bytes(data)
+                logger.info(f"[TaskTracer] VFS 快照已保存: {len(all_files)} 个文件")
+            except Exception as e:
+                logger.error(f"[TaskTracer] 保存 VFS 快照失败: {e}")
+
+        return _TRACER_IO_POOL.submit(write_snapshot)
 
     def finalize(
         self,
@@ -532,14 +700,29 @@ Event: LLM Call {self.prompt_counter}
             error_summary=error_summary,
         )
 
-        # 保存元数据（00_ 前缀确保排在最前）
-        self._save_metadata(final_status, error_summary)
-
-        # 生成分析提示（99_ 前缀确保排在最后）
-        self._generate_analysis_prompt(final_status, error_summary)
+        # 元数据（00_ 前缀）与分析输入（99_ 前缀）提交到落盘线程池，
+        # 与日志尾部的写入并行；关闭句柄前统一等待完成
+        report_futures = [
+            _TRACER_IO_POOL.submit(self._save_metadata, final_status, error_summary),
+            _TRACER_IO_POOL.submit(self._generate_analysis_prompt, final_status, error_summary),
+        ]
 
-        # 写入日志统计
+        # 写入日志统计并关闭常驻句柄（之后若仍有事件，
+        # _write_record 会以追加模式重开）
         self._write_log_footer()
+        if self._log_fh is not None and not self._log_fh.closed:
+            self._log_fh.close()
+
+        # 二进制日志完整后渲染人类可读的文本视图
+        report_futures.append(_TRACER_IO_POOL.submit(render_trace_log, self.task_dir))
+
+        for future in report_futures:
+            future.result()
+
+        # 释放 prompts 目录 fd（之后的写入退回完整路径解析）
+        if self._prompts_dir_fd is not None:
+            os.close(self._prompts_dir_fd)
+            self._prompts_dir_fd = None
 
         logger.info(f"[TaskTracer] 任务追踪已完成: {self.task_id}")
 
@@ -550,15 +733,6 @@ Event: LLM Call {self.prompt_counter}
             final_status: 最终状态
             error_summary: 错误摘要
         """
-        # 统计涉及的 Agent
-        agents_involved = list({e["agent_id"] for e in self.events})
-
-        # 统计各类事件
-        event_types = {}
-        for event in self.events:
-            event_type = event["event_type"]
-            event_types[event_type] = event_types.get(event_type, 0) + 1
-
         metadata = {
             "task_id": self.task_id,
             "chat_key": self.chat_key,
@@ -566,172 +740,236 @@ Event: LLM Call {self.prompt_counter}
             "task_description": self.task_description,
             "start_time": datetime.fromtimestamp(self.start_time).isoformat(),
             "end_time": datetime.now().isoformat(),
-            "duration_seconds": time.time() - self.start_time,
+            "duration_seconds": (time.perf_counter_ns() - self._start_perf_ns) / 1e9,
             "final_status": final_status,
-            "total_events": len(self.events),
-            "agents_involved": agents_involved,
-            "event_types": event_types,
+            "total_events": self._event_count,
+            "agents_involved": list(self._agents_set),
+            "event_types": dict(self._event_type_counts),
             "error_summary": error_summary,
         }
 
         metadata_path = self.task_dir / "00_metadata.json"
-        with metadata_path.open("w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        metadata_path.write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
 
         logger.debug(f"[TaskTracer] 元数据已保存: {metadata_path}")
 
     def _write_log_footer(self) -> None:
-        """写入日志文件尾部统计信息"""
-        duration = time.time() - self.start_time
-        agents = list({e["agent_id"] for e in self.events})
+        """写入尾部统计记录"""
+        footer = {
+            "ftr": {
+                "duration": (time.perf_counter_ns() - self._start_perf_ns) // 1_000_000_000,
+                "agents": list(self._agents_set),
+                "llm_calls": self._llm_calls,
+                # REVIEW_START 暂未使用
+                "reviews": self._event_type_counts.get("REVIEW_START", 0),
+                "events": self._event_count,
+                "prompts": self.prompt_counter,
+            },
+        }
+        self._write_record(orjson.dumps(footer), flush=True)
 
-        # 统计各类事件
-        llm_calls = sum(1 for e in self.events if e["event_type"] == TaskEvent.LLM_CALL_START)
-        reviews = sum(1 for e in self.events if e["event_type"] == "REVIEW_START")  # REVIEW_START 暂未使用
+    def _generate_analysis_prompt(self, final_status: str, error_summary: str) -> None:
+        """保存分析所需的原始输入并写出占位文档
 
-        footer = f"""
-{"=" * 80}
-任务统计
-{"=" * 80}
-总耗时: {int(duration // 60)} 分 {int(duration % 60)} 秒
-Agent 数量: {len(agents)} ({", ".join(agents)})
-LLM 调用: {llm_calls} 次
-审查轮次: {reviews} 次
-总事件数: {len(self.events)}
+        完整的 Markdown 分析文档不在 finalize 时渲染（多数任务无人查看，
+        属纯写放大）：这里只落盘 99_analysis_inputs.json 和一个带状态的
+        占位 99_analysis_prompt.md，完整文档由 render_analysis() 按需生成。
 
-{"=" * 80}
-相关文件
-{"=" * 80}
-元数据: 00_metadata.json
-分析提示: 99_analysis_prompt.md
-提示词日志: prompts/ 目录（{self.prompt_counter} 个文件）
-VFS 快照: vfs_snapshot/ 目录
+        Args:
+            final_status: 最终状态
+            error_summary: 错误摘要
+        """
+        duration = (time.perf_counter_ns() - self._start_perf_ns) // 1_000_000_000
+
+        inputs = {
+            "task_id": self.task_id,
+            "root_agent_id": self.root_agent_id,
+            "task_description": self.task_description,
+            "created_at": datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S"),
+            "final_status": final_status,
+            "error_summary": error_summary,
+            "duration_seconds": duration,
+            "agents": list(self._agents_set),
+            "event_types": list(self._event_type_counts),
+            "key_events": [list(evt) for evt in self._key_events],
+            "prompt_filenames": self._prompt_filenames,
+            "additional_events": [],
+        }
+        inputs_path = self.task_dir / "99_analysis_inputs.json"
+        inputs_path.write_bytes(orjson.dumps(inputs, option=orjson.OPT_INDENT_2))
+
+        stub = f"""# 任务分析提示 - {self.task_id}
+
+- **最终状态**: `{final_status}`
+
+完整分析文档尚未渲染。调用 `services.task_tracer.render_analysis(task_dir)`
+从 `99_analysis_inputs.json` 生成完整内容。
 
-{"=" * 80}
+{_PENDING_MARKER}
 """
-        with self.log_file.open("a", encoding="utf-8") as f:
-            f.write(footer)
+        analysis_path = self.task_dir / "99_analysis_prompt.md"
+        analysis_path.write_text(stub, encoding="utf-8")
 
-    def _generate_diagnostic_section(self) -> str:
-        """生成诊断检查部分
-        
-        检测关键事件是否缺失，返回 markdown 格式的诊断报告。
-        
-        Returns:
-            诊断报告字符串（可能为空）
-        """
-        event_types_set = {e["event_type"] for e in self.events}
-        
-        # 根据不同的任务终态，检查应该存在的事件
-        # 基础事件（所有任务都应该有）
-        base_events = ["TASK_START", "TASK_END"]
-        
-        # 如果任务成功或编译失败，应该有编译相关事件
-        compile_events = ["FINAL_COMPILE_START"]
-        if "FINAL_COMPILE_SUCCESS" in event_types_set:
-            compile_events.append("FINAL_COMPILE_SUCCESS")
-        
-        # 如果任务成功，应该有部署事件
-        deploy_events = []
-        if "DEPLOY_SUCCESS" in event_types_set or "DEPLOY_FAILED" in event_types_set:
-            deploy_events = ["DEPLOY_START"]
-        
-        # 检查通知事件
-        should_have_notification = (
-            "TASK_END" in event_types_set  # 只要任务结束了，就应该有通知
-        )
-        
-        missing_events = []
-        warnings = []
-        
-        # 检查基础事件
-        for evt in base_events:
-            if evt not in event_types_set:
-                missing_events.append(evt)
-        
-        # 检查编译事件（只在有编译相关事件时检查）
-        if any(e.startswith("FINAL_COMPILE") for e in event_types_set):
-            for evt in compile_events:
-                if evt not in event_types_set:
-                    missing_events.append(evt)
-        
-        # 检查部署事件
-        for evt in deploy_events:
-            if evt not in event_types_set:
-                missing_events.append(evt)
-        
-        # 检查通知事件
-        if should_have_notification and "NOTIFICATION_SENT" not in event_types_set:
-            warnings.append("没有记录到 NOTIFICATION_SENT 事件，主 Agent 可能未收到通知")
-        
-        # 生成诊断报告
-        if not missing_events and not warnings:
-            return ""
-        
-        sections = []
-        if missing_events:
-            sections.append(f"> [!WARNING]\n> 缺失关键事件: {', '.join(missing_events)}")
-        
-        for warning in warnings:
-            sections.append(f"> [!CAUTION]\n> {warning}")
-        
-        return "## 🔔 自动诊断\n\n" + "\n\n".join(sections) + "\n"
+        logger.debug(f"[TaskTracer] 分析输入已保存: {inputs_path}")
 
-    def _generate_analysis_prompt(self, final_status: str, error_summary: str) -> None:
-        """生成自包含的分析提示文档
+    def update_summary(
+        self,
+        new_status: str,
+        additional_events: List[str],
+        error_summary: str = "",
+    ) -> None:
+        """更新分析输入的状态和事件时间线
+
+        在 TASK_CONTINUE 后的任何终态（成功/失败/强制交付）调用。
+        占位文档只同步状态行；已渲染过的完整文档会重新渲染。
 
         Args:
-            final_status: 最终状态
+            new_status: 新的最终状态
+            additional_events: 需要追加的事件描述列表
             error_summary: 错误摘要
         """
-        duration = time.time() - self.start_time
-        agents = list({e["agent_id"] for e in self.events})
-
-        # 提取关键时间线事件
-        key_events = []
-        for event in self.events:
-            if event["event_type"] in [
-                "TASK_START",
-                "AGENT_CREATED",
-                "REVIEW_START",
-                "REVIEW_RESULT",
-                "FINAL_COMPILE_START",
-                "FINAL_COMPILE_SUCCESS",
-                "FINAL_COMPILE_FAILED",
-                "DEPLOY_START",
-                "DEPLOY_SUCCESS",
-                "DEPLOY_FAILED",
-                "NOTIFICATION_SENT",
-                "TASK_END",
-            ]:
-                key_events.append(
-                    f"- {event['timestamp']} [{event['event_type']}] "
-                    f"{event['agent_id']}: {event['message']}",
+        inputs_path = self.task_dir / "99_analysis_inputs.json"
+        if not inputs_path.exists():
+            logger.warning(f"[TaskTracer] 分析输入不存在，无法更新: {inputs_path}")
+            return
+
+        try:
+            inputs = orjson.loads(inputs_path.read_bytes())
+            inputs["final_status"] = new_status
+            inputs["duration_seconds"] = (
+                time.perf_counter_ns() - self._start_perf_ns
+            ) // 1_000_000_000
+            inputs["agents"] = list(self._agents_set)
+            if error_summary:
+                inputs["error_summary"] = error_summary
+            if additional_events:
+                inputs["additional_events"].extend(additional_events)
+            inputs_path.write_bytes(orjson.dumps(inputs, option=orjson.OPT_INDENT_2))
+
+            analysis_path = self.task_dir / "99_analysis_prompt.md"
+            content = analysis_path.read_text(encoding="utf-8") if analysis_path.exists() else ""
+            if _PENDING_MARKER in content:
+                # 占位文档：只同步状态行
+                analysis_path.write_text(
+                    _RE_STATUS.sub(f"**最终状态**: `{new_status}`", content),
+                    encoding="utf-8",
                 )
+            else:
+                # 已渲染过完整文档，按新输入重新渲染保持一致
+                render_analysis(self.task_dir)
 
-        key_timeline = "\n".join(key_events[:30])  # 最多显示 30 个关键事件
+            logger.info(f"[TaskTracer] 分析文件已更新: {new_status}")
 
-        # 列出所有提示词日志
-        prompt_logs = sorted((self.task_dir / "prompts").glob("*.log"))
-        prompt_list = "\n".join(f"│   ├── {log.name}" for log in prompt_logs)
+        except Exception as e:
+            logger.error(f"[TaskTracer] 更新分析文件失败: {e}")
+
+    def elapsed(self) -> str:
+        """获取当前格式化的 T+ 时间戳"""
+        return self._format_t_plus(time.perf_counter_ns() - self._start_perf_ns)
+
+
+def _diagnostic_section(event_types_set: "set[str]") -> str:
+    """生成诊断检查部分
+
+    检测关键事件是否缺失，返回 markdown 格式的诊断报告。
+
+    Returns:
+        诊断报告字符串（可能为空）
+    """
+    # 根据不同的任务终态，检查应该存在的事件
+    # 基础事件（所有任务都应该有）
+    base_events = ["TASK_START", "TASK_END"]
+
+    # 如果任务成功或编译失败，应该有编译相关事件
+    compile_events = ["FINAL_COMPILE_START"]
+    if "FINAL_COMPILE_SUCCESS" in event_types_set:
+        compile_events.append("FINAL_COMPILE_SUCCESS")
+
+    # 如果任务成功，应该有部署事件
+    deploy_events = []
+    if "DEPLOY_SUCCESS" in event_types_set or "DEPLOY_FAILED" in event_types_set:
+        deploy_events = ["DEPLOY_START"]
+
+    # 检查通知事件
+    should_have_notification = (
+        "TASK_END" in event_types_set  # 只要任务结束了，就应该有通知
+    )
+
+    missing_events = []
+    warnings = []
+
+    # 检查基础事件
+    for evt in base_events:
+        if evt not in event_types_set:
+            missing_events.append(evt)
+
+    # 检查编译事件（只在有编译相关事件时检查）
+    if any(e.startswith("FINAL_COMPILE") for e in event_types_set):
+        for evt in compile_events:
+            if evt not in event_types_set:
+                missing_events.append(evt)
 
-        # 生成分析提示文档
-        analysis_prompt = f"""# 任务分析提示 - {self.task_id}
+    # 检查部署事件
+    for evt in deploy_events:
+        if evt not in event_types_set:
+            missing_events.append(evt)
+
+    # 检查通知事件
+    if should_have_notification and "NOTIFICATION_SENT" not in event_types_set:
+        warnings.append("没有记录到 NOTIFICATION_SENT 事件，主 Agent 可能未收到通知")
+
+    # 生成诊断报告
+    if not missing_events and not warnings:
+        return ""
+
+    sections = []
+    if missing_events:
+        sections.append(f"> [!WARNING]\n> 缺失关键事件: {', '.join(missing_events)}")
+
+    for warning in warnings:
+        sections.append(f"> [!CAUTION]\n> {warning}")
+
+    return "## 🔔 自动诊断\n\n" + "\n\n".join(sections) + "\n"
+
+
+def _render_markdown(inputs: Dict[str, Any]) -> str:
+    """从分析输入渲染完整的分析提示文档"""
+    task_id = inputs["task_id"]
+    duration = inputs["duration_seconds"]
+    minutes, seconds = divmod(int(duration), 60)
+
+    # 关键时间线事件在 log_event 中按白名单增量收集（有界 deque）
+    key_timeline = "\n".join(
+        f"- {timestamp} [{event_type}] {agent_id}: {message}"
+        for timestamp, event_type, agent_id, message in inputs["key_events"]
+    )
+
+    # 用户反馈后追加的事件
+    if inputs.get("additional_events"):
+        extra = "\n".join(inputs["additional_events"])
+        key_timeline += f"\n# === 用户反馈后的事件 ===\n{extra}"
+
+    # 列出所有提示词日志（记录时按序号递增，无需再扫描目录排序）
+    prompt_list = "\n".join(f"│   ├── {name}" for name in inputs["prompt_filenames"])
+
+    error_summary = inputs["error_summary"]
+
+    return f"""# 任务分析提示 - {task_id}
 
 ## 📋 任务概览
 
-- **任务 ID**: `{self.task_id}`
-- **创建时间**: `{datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S")}`
-- **根 Agent**: `{self.root_agent_id}`
-- **任务描述**: {self.task_description}
-- **最终状态**: `{final_status}`
-- **总耗时**: `{int(duration // 60)} 分 {int(duration % 60)} 秒`
-- **涉及 Agent**: `{", ".join(agents)}`
+- **任务 ID**: `{task_id}`
+- **创建时间**: `{inputs["created_at"]}`
+- **根 Agent**: `{inputs["root_agent_id"]}`
+- **任务描述**: {inputs["task_description"]}
+- **最终状态**: `{inputs["final_status"]}`
+- **总耗时**: `{minutes} 分 {seconds} 秒`
+- **涉及 Agent**: `{", ".join(inputs["agents"])}`
 
 ## 📂 本任务的完整日志结构
 
 ```
-tasks/task_{self.task_id}/
+tasks/task_{task_id}/
 ├── 00_metadata.json                          # 任务元数据
 ├── 01_task_trace.log                         # T+ 时间线日志
 ├── 99_analysis_prompt.md                     # 本文件
@@ -753,7 +991,7 @@ tasks/task_{self.task_id}/
 {key_timeline}
 ```
 
-{self._generate_diagnostic_section()}
+{_diagnostic_section(set(inputs["event_types"]))}
 
 ## 📝 分析指引
 
@@ -840,83 +1078,105 @@ tasks/task_{self.task_id}/
 - 始终使用中文进行回答
 """
 
-        analysis_path = self.task_dir / "99_analysis_prompt.md"
-        with analysis_path.open("w", encoding="utf-8") as f:
-            f.write(analysis_prompt)
 
-        logger.debug(f"[TaskTracer] 分析提示已生成: {analysis_path}")
+def render_analysis(task_dir: Union[str, Path]) -> str:
+    """按需渲染完整的分析提示文档
 
-    def update_summary(
-        self,
-        new_status: str,
-        additional_events: List[str],
-        error_summary: str = "",
-    ) -> None:
-        """更新 99_analysis_prompt.md 的状态和事件时间线
-        
-        在 TASK_CONTINUE 后的任何终态（成功/失败/强制交付）调用。
-        
-        Args:
-            new_status: 新的最终状态
-            additional_events: 需要追加的事件描述列表
-            error_summary: 错误摘要
-        """
-        import re
-        
-        analysis_path = self.task_dir / "99_analysis_prompt.md"
-        if not analysis_path.exists():
-            logger.warning(f"[TaskTracer] 分析文件不存在，无法更新: {analysis_path}")
-            return
-        
-        try:
-            content = analysis_path.read_text(encoding="utf-8")
-            
-            # 更新最终状态
-            content = re.sub(
-                r"\*\*最终状态\*\*: `[^`]+`",
-                f"**最终状态**: `{new_status}`",
-                content,
-            )
-            
-            # 更新总耗时
-            elapsed = time.time() - self.start_time
-            minutes = int(elapsed // 60)
-            seconds = int(elapsed % 60)
-            content = re.sub(
-                r"\*\*总耗时\*\*: `[^`]+`",
-                f"**总耗时**: `{minutes} 分 {seconds} 秒`",
-                content,
-            )
-            
-            # 更新涉及 Agent 列表
-            agents = list({e["agent_id"] for e in self.events})
-            content = re.sub(
-                r"\*\*涉及 Agent\*\*: `[^`]+`",
-                f"**涉及 Agent**: `{', '.join(agents)}`",
-                content,
-            )
-            
-            # 更新问题描述
-            if error_summary:
-                content = re.sub(
-                    r"## 🔍 问题描述\n\n[^\n]+",
-                    f"## 🔍 问题描述\n\n{error_summary}",
-                    content,
-                )
-            
-            # 追加新的时间线事件
-            if additional_events:
-                timeline_marker = "```\n\n## 📝 分析指引"
-                new_events = "\n".join(additional_events)
-                insert_content = f"\n# === 用户反馈后的事件 ===\n{new_events}\n"
-                content = content.replace(timeline_marker, insert_content + timeline_marker)
-            
-            analysis_path.write_text(content, encoding="utf-8")
-            logger.info(f"[TaskTracer] 分析文件已更新: {new_status}")
-            
-        except Exception as e:
-            logger.error(f"[TaskTracer] 更新分析文件失败: {e}")
+    从任务目录下的 99_analysis_inputs.json 读取 finalize 时保存的
+    原始输入，渲染并覆盖 99_analysis_prompt.md 占位文件。
 
-    def elapsed(self) -> str:
-        """获取当前格式化的 T+ 时间戳"""
-        return self._format_t_plus(time.time() - self.start_time)
+    Args:
+        task_dir: 任务目录（tasks/task_<id>/）
+
+    Returns:
+        生成的 99_analysis_prompt.md 路径
+    """
+    task_dir = Path(task_dir)
+    inputs = orjson.loads((task_dir / "99_analysis_inputs.json").read_bytes())
+
+    analysis_path = task_dir / "99_analysis_prompt.md"
+    analysis_path.write_text(_render_markdown(inputs), encoding="utf-8")
+
+    logger.debug(f"[TaskTracer] 分析提示已渲染: {analysis_path}")
+    return str(analysis_path)
+
+
+def _iter_trace_records(data: bytes):
+    """迭代二进制追踪日志中的记录（尾部截断的记录自动忽略）"""
+    offset = 0
+    total = len(data)
+    while offset + 4 <= total:
+        (length,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        if offset + length > total:
+            break  # 崩溃现场的半条记录
+        yield orjson.loads(data[offset:offset + length])
+        offset += length
+
+
+def render_trace_log(task_dir: Union[str, Path]) -> str:
+    """从二进制追踪日志渲染人类可读的 01_task_trace.log
+
+    finalize 时自动调用；崩溃后也可对残留的 .bin 手动调用，
+    截断的尾记录会被跳过。
+
+    Args:
+        task_dir: 任务目录（tasks/task_<id>/）
+
+    Returns:
+        生成的 01_task_trace.log 路径
+    """
+    task_dir = Path(task_dir)
+    data = (task_dir / "01_task_trace.bin").read_bytes()
+
+    parts: List[str] = []
+    for record in _iter_trace_records(data):
+        if "hdr" in record:
+            hdr = record["hdr"]
+            parts.append(f"""{_SEP80}
+任务追踪日志 - Task {hdr["task_id"]}
+{_SEP80}
+任务 ID: {hdr["task_id"]}
+根 Agent: {hdr["root_agent_id"]}
+任务描述: {hdr["task_description"]}
+创建时间: {hdr["created_at"]}
+{_SEP80}
+
+""")
+        elif "ftr" in record:
+            ftr = record["ftr"]
+            agents = ftr["agents"]
+            duration = ftr["duration"]
+            parts.append(f"""
+{_SEP80}
+任务统计
+{_SEP80}
+总耗时: {duration // 60} 分 {duration % 60} 秒
+Agent 数量: {len(agents)} ({", ".join(agents)})
+LLM 调用: {ftr["llm_calls"]} 次
+审查轮次: {ftr["reviews"]} 次
+总事件数: {ftr["events"]}
+
+{_SEP80}
+相关文件
+{_SEP80}
+元数据: 00_metadata.json
+分析提示: 99_analysis_prompt.md
+提示词日志: prompts/ 目录（{ftr["prompts"]} 个文件）
+VFS 快照: vfs_snapshot/ 目录
+
+{_SEP80}
+""")
+        else:
+            # === 结构化事件格式 ===
+            # T+00:00:01.123 [EVENT_TYPE] AgentID
+            #   └─ Message
+            #   └─ Key: Value
+            timestamp = TaskTracer._format_t_plus(record["t"])
+            parts.append(f"\n{timestamp} [{record['e']}] {record['a']}\n  └─ {record['m']}\n")
+            for key, val_str in record.get("md", {}).items():
+                parts.append(f"  └─ {key}: {val_str}\n")
+
+    log_path = task_dir / "01_task_trace.log"
+    log_path.write_text("".join(parts), encoding="utf-8")
+    return str(log_path)
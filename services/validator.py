@@ -3,12 +3,22 @@
 Provides validation logic for agent outputs, ensuring they meet the contracts (Schema/Interface).
 """
 
-import json
 import re
 from typing import Dict, Optional, Tuple
 
+import orjson
+
 from .logger import logger
 
+# Forbidden substrings in TS/TSX output. Compiled into one alternation so
+# the content is scanned in a single pass regardless of how many patterns
+# are registered here.
+_TS_FORBIDDEN = {
+    "```": "Markdown code blocks found in file content",
+    "<script>": "HTML script tags found in TS/TSX file",
+}
+_TS_FORBIDDEN_RE = re.compile("|".join(re.escape(pat) for pat in _TS_FORBIDDEN))
+
 
 class Validator:
     @staticmethod
@@ -23,16 +33,17 @@ class Validator:
             (valid, error_message)
         """
         try:
-            # 1. Syntax Check
-            data = json.loads(content)
-            assert data is not None
+            # 1. Syntax Check (orjson parses in C; the decoded tree is
+            # discarded immediately since only syntax matters here)
+            if orjson.loads(content) is None:
+                return False, "JSON content is null"
 
             # 2. Schema Check (if strictly required)
             # For now, we only ensure valid JSON.
             # Integrating a full 'jsonschema' lib might require extra dependencies.
             # We can do simple structural checks if needed.
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             error_msg = f"JSON Syntax Error:line {e.lineno} column {e.colno}: {e.msg}"
             logger.warning(f"[Validator] ❌ {error_msg}")
             return False, error_msg
@@ -44,14 +55,9 @@ class Validator:
     @staticmethod
     def validate_typescript(content: str) -> Tuple[bool, str]:
         """Validate TypeScript content (Basic Syntax)."""
-        forbidden_patterns = [
-            ("```", "Markdown code blocks found in file content"),
-            ("<script>", "HTML script tags found in TS/TSX file"),
-        ]
-
-        for pat, msg in forbidden_patterns:
-            if pat in content:
-                return False, msg
+        match = _TS_FORBIDDEN_RE.search(content)
+        if match:
+            return False, _TS_FORBIDDEN[match.group(0)]
 
         return True, "Basic syntax checks passed"
 
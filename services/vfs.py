@@ -4,31 +4,89 @@
 去除所有权机制，支持自由读写。
 """
 
+import posixpath
 import re
-from typing import Dict, List, Optional
+import sys
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
 
 from .logger import logger
 
+# extract_exports 的五种导出形式合并为一个带命名分组的正则，
+# 模块加载时编译一次，整个文件只需扫描一遍（而非五遍）。
+# 分支顺序有讲究：default function/class 必须排在 default 变量之前。
+# 括号体允许跨行（多行 export {...} 很常见），但限制长度上界，
+# 防止缺失右括号时对后续全文做无界扫描
+_EXPORT_RE = re.compile(
+    r"export\s+(?:const|let|var|function|class|async\s+function)\s+(?P<decl>\w+)"
+    r"|export\s+(?:type|interface)\s+(?P<typ>\w+)"
+    r"|export\s+default\s+(?P<deffunc>function|class)\s+(?P<deffuncname>\w+)?"
+    r"|export\s+default\s+(?P<defvar>\w+)\s*;"
+    r"|export\s*\{(?P<brace>[^}]{1,1024})\}",
+)
+
 
 class ProjectContext:
     """项目上下文，管理虚拟文件系统"""
 
+    __slots__ = ("chat_key", "task_id", "files", "_export_cache")
+
     def __init__(self, chat_key: str, task_id: str):
         self.chat_key = chat_key
         self.task_id = task_id
         # filepath -> content
         self.files: Dict[str, str] = {}
+        # filepath -> (内容哈希, 导出名列表)
+        # 编译失败重试时 extract_exports 会对同一文件反复调用，
+        # 内容未变则直接复用上次的扫描结果
+        self._export_cache: Dict[str, tuple] = {}
 
     def _normalize_path(self, path: str) -> str:
-        """规范化文件路径"""
-        return path.strip().lstrip("./").lstrip("/")
+        """规范化文件路径（去掉开头的 ./ 或 / 前缀，折叠 .. 段）
+
+        用索引扫描代替正则/lstrip：常见的"本来就规范"的路径
+        不产生任何切片拷贝。注意按前缀语义处理，".env" 这类
+        点开头文件名不受影响。
+
+        路径来自模型输出且下游会直接 join 到真实目录写盘
+        （trace 快照、编译临时目录），带 ".." 的路径先 normpath
+        折叠，仍向上逃逸的前缀直接剥掉，把路径锚定回项目根。
+
+        结果做 intern：同一路径在 files 键、导出缓存键和各处日志/提示
+        中反复出现，intern 后共享同一字符串对象，dict 查找也能走
+        指针相等的快路径。
+        """
+        s = path.strip()
+        i = 0
+        n = len(s)
+        while i < n:
+            if s[i] == "/":
+                i += 1
+            elif s.startswith("./", i):
+                i += 2
+            else:
+                break
+        if i:
+            s = s[i:]
+        if ".." in s:
+            s = posixpath.normpath(s)
+            while s.startswith("../"):
+                s = s[3:]
+            if s in (".", ".."):
+                s = ""
+        return sys.intern(s)
 
     def write_file(self, path: str, content: str) -> None:
         """写入文件"""
         clean_path = self._normalize_path(path)
         self.files[clean_path] = content
+        self._export_cache.pop(clean_path, None)
         logger.info(f"[VFS] 💾 写入文件: {clean_path} ({len(content)} 字符)")
 
+    def exists(self, path: str) -> bool:
+        """检查文件是否存在（只查键，不取内容）"""
+        return self._normalize_path(path) in self.files
+
     def read_file(self, path: str) -> Optional[str]:
         """读取文件"""
         clean_path = self._normalize_path(path)
@@ -39,6 +97,7 @@ class ProjectContext:
         clean_path = self._normalize_path(path)
         if clean_path in self.files:
             del self.files[clean_path]
+            self._export_cache.pop(clean_path, None)
             logger.info(f"[VFS] 🗑️ 删除文件: {clean_path}")
             return True
         return False
@@ -47,13 +106,19 @@ class ProjectContext:
         """列出所有文件"""
         return list(self.files.keys())
 
-    def get_snapshot(self) -> Dict[str, str]:
-        """获取所有文件快照（用于编译）"""
-        return self.files.copy()
+    def get_snapshot(self) -> Mapping[str, str]:
+        """获取所有文件的只读视图（用于编译）
+
+        返回零拷贝的 mappingproxy 而非 dict 副本：编译/提交路径
+        只读不写，没必要每次都整表克隆。需要可变副本的调用方
+        自行 dict(snapshot)。
+        """
+        return MappingProxyType(self.files)
 
     def clear(self) -> None:
         """清空所有文件"""
         self.files.clear()
+        self._export_cache.clear()
         logger.info("[VFS] 🗑️ 已清空所有文件")
 
     def extract_exports(self, path: str) -> List[str]:
@@ -68,52 +133,57 @@ class ProjectContext:
         Returns:
             导出名列表，默认导出用 'default' 表示
         """
-        content = self.read_file(path)
+        clean_path = self._normalize_path(path)
+        content = self.files.get(clean_path)
         if not content:
             return []
 
+        # 命中缓存（写入/删除时已失效，哈希校验兜底）
+        cached = self._export_cache.get(clean_path)
+        content_hash = hash(content)
+        if cached is not None and cached[0] == content_hash:
+            return list(cached[1])
+
         exports: List[str] = []
 
-        # 1. export const/let/var/function/class NAME
-        pattern1 = r"export\s+(?:const|let|var|function|class|async\s+function)\s+(\w+)"
-        exports.extend(re.findall(pattern1, content))
-
-        # 2. export type/interface NAME
-        pattern2 = r"export\s+(?:type|interface)\s+(\w+)"
-        exports.extend(re.findall(pattern2, content))
-
-        # 3. export default function/class NAME 或匿名
-        pattern3 = r"export\s+default\s+(?:function|class)\s+(\w+)?"
-        for match in re.finditer(pattern3, content):
-            name = match.group(1)
-            if name:
-                exports.append(f"default ({name})")
-            elif "default" not in [e for e in exports if e.startswith("default")]:
-                exports.append("default")
-
-        # 4. export default NAME (变量)
-        pattern4 = r"export\s+default\s+(\w+)\s*;"
-        for match in re.finditer(pattern4, content):
-            name = match.group(1)
-            if name not in ("function", "class", "async") and f"default ({name})" not in exports:
-                exports.append(f"default ({name})")
-
-        # 5. export { A, B, C } 或 export { A as B }
-        pattern5 = r"export\s*\{([^}]+)\}"
-        for match in re.finditer(pattern5, content):
-            items = match.group(1)
-            for item in items.split(","):
-                item = item.strip()
-                if " as " in item:
-                    parts = item.split(" as ")
-                    if len(parts) == 2:
-                        exports.append(parts[1].strip())
-                else:
-                    if item:
+        # 单遍扫描，按命中的命名分组分派到对应的导出形式
+        for match in _EXPORT_RE.finditer(content):
+            kind = match.lastgroup
+            if kind in ("decl", "typ"):
+                exports.append(match.group(kind))
+            elif kind in ("deffunc", "deffuncname"):
+                # export default function/class NAME 或匿名
+                # （匿名时名字分组未参与匹配，lastgroup 落在关键字分组上）
+                name = match.group("deffuncname")
+                if name:
+                    exports.append(f"default ({name})")
+                elif not any(e.startswith("default") for e in exports):
+                    exports.append("default")
+            elif kind == "defvar":
+                # export default NAME (变量)
+                name = match.group("defvar")
+                if name not in ("function", "class", "async"):
+                    exports.append(f"default ({name})")
+            elif kind == "brace":
+                # export { A, B, C } 或 export { A as B }
+                for item in match.group("brace").split(","):
+                    item = item.strip()
+                    if " as " in item:
+                        parts = item.split(" as ")
+                        if len(parts) == 2:
+                            exports.append(parts[1].strip())
+                    elif item:
                         exports.append(item)
 
-        # 去重
-        return list(dict.fromkeys(exports))
+        # 去重（保持首次出现的顺序）
+        seen = set()
+        result = []
+        for name in exports:
+            if name not in seen:
+                seen.add(name)
+                result.append(name)
+        self._export_cache[clean_path] = (content_hash, result)
+        return list(result)
 
 
 # 全局 VFS 管理器 (key -> ProjectContext)
@@ -133,9 +203,11 @@ def get_project_context(chat_key: str, task_id: str) -> ProjectContext:
         task_id: 任务 ID
     """
     key = _make_key(chat_key, task_id)
-    if key not in _contexts:
-        _contexts[key] = ProjectContext(chat_key, task_id)
-    return _contexts[key]
+    # 单次 get 代替 contains + 两次取值（每次工具分发都会走到这里）
+    ctx = _contexts.get(key)
+    if ctx is None:
+        ctx = _contexts[key] = ProjectContext(chat_key, task_id)
+    return ctx
 
 
 def clear_project_context(chat_key: str, task_id: str) -> None:
@@ -3,8 +3,11 @@
 定义工具注册装饰器和工具调用机制。
 """
 
+import inspect
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, List, Optional
+
+import orjson
 
 if TYPE_CHECKING:
     from ..core.context import ToolContext
@@ -13,8 +16,12 @@ if TYPE_CHECKING:
 # 工具注册表
 _TOOL_REGISTRY: Dict[str, "ToolDefinition"] = {}
 
+# 注册表键的快照，随注册更新；未知工具的错误路径直接复用，
+# 不必每次都重新物化 keys 列表
+_available_tools: tuple = ()
+
 
-@dataclass
+@dataclass(slots=True)
 class ToolDefinition:
     """工具定义"""
 
@@ -22,17 +29,27 @@ class ToolDefinition:
     description: str
     parameters: Dict[str, Any]
     handler: Callable
+    # to_openai_schema 的惰性缓存（slots 下不能用 cached_property）
+    _schema: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
+    # 注册时预序列化的 schema JSON，直接拼 HTTP 载荷时免去 dict 编码
+    schema_json: str = field(default="", repr=False, compare=False)
+    # 注册时从 handler 签名提取的参数集合（不含 ctx）。
+    # all_params 为 None 表示 handler 带 **kwargs，接受任意参数
+    required_params: FrozenSet[str] = field(default=frozenset(), repr=False, compare=False)
+    all_params: Optional[FrozenSet[str]] = field(default=None, repr=False, compare=False)
 
     def to_openai_schema(self) -> Dict[str, Any]:
-        """转换为 OpenAI Tool Call 格式"""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": self.parameters,
-            },
-        }
+        """转换为 OpenAI Tool Call 格式（首次调用时构建并缓存）"""
+        if self._schema is None:
+            self._schema = {
+                "type": "function",
+                "function": {
+                    "name": self.name,
+                    "description": self.description,
+                    "parameters": self.parameters,
+                },
+            }
+        return self._schema
 
 
 def agent_tool(
@@ -66,7 +83,27 @@ def agent_tool(
             parameters=parameters,
             handler=func,
         )
+        # schema 的字典与 JSON 形式都在注册时算好，此后纯读
+        tool_def.schema_json = orjson.dumps(tool_def.to_openai_schema()).decode("utf-8")
+
+        # 预提取参数签名，调用前做廉价的键集合校验，
+        # 不必依赖抛 TypeError 再捕获的慢路径
+        sig_params = list(inspect.signature(func).parameters.values())[1:]  # 跳过 ctx
+        if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in sig_params):
+            tool_def.all_params = None
+        else:
+            tool_def.all_params = frozenset(
+                p.name for p in sig_params
+                if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+            )
+        tool_def.required_params = frozenset(
+            p.name for p in sig_params
+            if p.default is inspect.Parameter.empty
+            and p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+        )
         _TOOL_REGISTRY[name] = tool_def
+        global _available_tools
+        _available_tools = tuple(_TOOL_REGISTRY.keys())
         return func
 
     return decorator
@@ -82,9 +119,33 @@ def get_tool(name: str) -> Optional[ToolDefinition]:
     return _TOOL_REGISTRY.get(name)
 
 
+# 工具 schema 列表缓存：(构建时的注册表大小, 列表)。
+# 注册只发生在导入期，此后每个 LLM 轮次直接复用同一个列表
+_OPENAI_TOOLS_CACHE: Optional[tuple] = None
+
+
 def get_openai_tools() -> List[Dict[str, Any]]:
-    """获取 OpenAI 格式的工具列表"""
-    return [tool.to_openai_schema() for tool in _TOOL_REGISTRY.values()]
+    """获取 OpenAI 格式的工具列表
+
+    每个 LLM 请求前都会调用，结果按注册表大小缓存；
+    返回值视为只读，调用方不应修改。
+    """
+    global _OPENAI_TOOLS_CACHE
+    if _OPENAI_TOOLS_CACHE is None or _OPENAI_TOOLS_CACHE[0] != len(_TOOL_REGISTRY):
+        _OPENAI_TOOLS_CACHE = (
+            len(_TOOL_REGISTRY),
+            [tool.to_openai_schema() for tool in _TOOL_REGISTRY.values()],
+        )
+    return _OPENAI_TOOLS_CACHE[1]
+
+
+def get_openai_tools_json() -> str:
+    """获取 OpenAI 格式工具列表的 JSON 字符串
+
+    直接拼接注册时预序列化的片段，供手工构造 HTTP 载荷的
+    调用方跳过整表 dict 编码。
+    """
+    return "[" + ",".join(tool.schema_json for tool in _TOOL_REGISTRY.values()) + "]"
 
 
 async def execute_tool(
@@ -130,7 +191,24 @@ async def execute_tool_safe(
         result = ToolResult.error(
             message=f"Tool '{name}' not found",
             error_type=ErrorType.TOOL_NOT_FOUND,
-            context={"available_tools": list(_TOOL_REGISTRY.keys())},
+            context={"available_tools": list(_available_tools)},
+        )
+        result.tool_name = name
+        return result
+
+    # 参数键集合预校验：比调用后捕获 TypeError 便宜得多
+    missing = tool.required_params - arguments.keys()
+    extra = arguments.keys() - tool.all_params if tool.all_params is not None else ()
+    if missing or extra:
+        parts = []
+        if missing:
+            parts.append(f"missing {sorted(missing)}")
+        if extra:
+            parts.append(f"unexpected {sorted(extra)}")
+        result = ToolResult.error(
+            message=f"Invalid arguments: {', '.join(parts)}",
+            error_type=ErrorType.TOOL_INVALID_ARGS,
+            context={"provided_args": list(arguments.keys())},
         )
         result.tool_name = name
         return result
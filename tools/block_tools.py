@@ -9,7 +9,7 @@
 """
 
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
 if TYPE_CHECKING:
@@ -21,7 +21,7 @@ if TYPE_CHECKING:
 _BLOCK_TOOL_REGISTRY: Dict[str, "BlockToolDefinition"] = {}
 
 
-@dataclass
+@dataclass(slots=True)
 class BlockToolDefinition:
     """块工具定义
     
@@ -36,21 +36,25 @@ class BlockToolDefinition:
     description: str
     handler: Optional[Callable] = None
     is_direct_write: bool = False  # FILE 类型直接写入，不需要 handler
-    
+    # end_pattern 的惰性缓存（slots 下不能用 cached_property）
+    _end_pattern: Optional[re.Pattern] = field(default=None, repr=False, compare=False)
+
     @property
     def start_pattern(self) -> str:
         """开始标记正则片段"""
         return self.name
-    
+
     @property
     def end_marker(self) -> str:
         """结束标记"""
         return f"<<<END_{self.name}>>>"
-    
+
     @property
     def end_pattern(self) -> re.Pattern[str]:
-        """结束标记正则"""
-        return re.compile(rf"<<<END_{self.name}>>>")
+        """结束标记正则（首次访问时编译并缓存）"""
+        if self._end_pattern is None:
+            self._end_pattern = re.compile(rf"<<<END_{self.name}>>>")
+        return self._end_pattern
 
 
 def block_tool(
@@ -118,18 +122,32 @@ def get_block_names() -> List[str]:
     return list(_BLOCK_TOOL_REGISTRY.keys())
 
 
+# 构建好的块开始正则缓存：(构建时的注册表大小, 编译结果)。
+# 注册只发生在导入期，此后每次解析直接复用同一个 Pattern
+_START_PATTERN_CACHE: Optional[tuple] = None
+
+
 def build_block_start_pattern() -> re.Pattern[str]:
     """动态构建块开始的正则表达式
-    
+
     Returns:
         匹配 <<<TYPE: arg>>> 的正则，其中 TYPE 为所有注册的块名
     """
+    global _START_PATTERN_CACHE
+    if _START_PATTERN_CACHE is not None and _START_PATTERN_CACHE[0] == len(_BLOCK_TOOL_REGISTRY):
+        return _START_PATTERN_CACHE[1]
+
     if not _BLOCK_TOOL_REGISTRY:
         # 无注册时返回不匹配任何内容的模式
-        return re.compile(r"(?!)")
-    
-    names = "|".join(_BLOCK_TOOL_REGISTRY.keys())
-    return re.compile(rf"<<<({names}):\s*([^>]+)>>>")
+        pattern = re.compile(r"(?!)")
+    else:
+        names = "|".join(_BLOCK_TOOL_REGISTRY.keys())
+        # 参数限定在单行且最长 512 字符：标签必须写在一行内，
+        # 有界字符类也避免在畸形输入上做无意义的超长扫描
+        pattern = re.compile(rf"<<<({names}):\s*([^>\n]{{1,512}})>>>")
+
+    _START_PATTERN_CACHE = (len(_BLOCK_TOOL_REGISTRY), pattern)
+    return pattern
 
 
 def get_block_end_pattern(block_name: str) -> Optional[re.Pattern[str]]:
@@ -4,6 +4,7 @@
 所有工具统一返回 ToolResult 类型，tool_name 由框架自动注入。
 """
 
+import heapq
 import re
 
 from ..core.context import ToolContext
@@ -11,6 +12,13 @@ from ..core.error_feedback import ToolResult
 from ..services.compiler_client import check_project, compile_project
 from . import agent_tool
 
+# enhance_compile_error 的错误信息匹配模式，模块加载时编译一次
+_MISSING_FILE_RE = re.compile(r'(?:File not found in VFS|Could not resolve)[:\s]*"?([^"\s]+)"?')
+_NO_EXPORT_RE = re.compile(r'No matching export in "([^"]+)"')
+
+# 错误提示中最多罗列的项目文件数
+_FILE_HINT_LIMIT = 30
+
 
 @agent_tool(
     name="compile",
@@ -117,10 +125,7 @@ def enhance_compile_error(error_msg: str, ctx: ToolContext) -> str:
 
     # 处理 "File not found" 错误 - 最常见的问题
     if "File not found" in error_msg or "Could not resolve" in error_msg:
-        match = re.search(
-            r'(?:File not found in VFS|Could not resolve)[:\s]*"?([^"\s]+)"?',
-            error_msg,
-        )
+        match = _MISSING_FILE_RE.search(error_msg)
         if match:
             missing_file = match.group(1)
             # 规范化路径
@@ -136,7 +141,7 @@ def enhance_compile_error(error_msg: str, ctx: ToolContext) -> str:
 
     # 处理 "No matching export" 错误
     if "No matching export" in error_msg:
-        match = re.search(r'No matching export in "([^"]+)"', error_msg)
+        match = _NO_EXPORT_RE.search(error_msg)
         if match:
             target_file = match.group(1)
             if target_file.startswith("./"):
@@ -148,10 +153,15 @@ def enhance_compile_error(error_msg: str, ctx: ToolContext) -> str:
             if exports:
                 hints.append(f"💡 '{target_file}' 的实际导出: {', '.join(exports)}")
 
-    # 添加当前文件列表
+    # 添加当前文件列表（上限 30 个：提示是给 LLM 读的，
+    # 大项目全量罗列既费 token 又费一次全排序）
     files = ctx.project.list_files()
     if files:
-        hints.append(f"📁 当前项目文件: {', '.join(sorted(files))}")
+        shown = heapq.nsmallest(_FILE_HINT_LIMIT, files)
+        listing = ", ".join(shown)
+        if len(files) > _FILE_HINT_LIMIT:
+            listing += f" ... 及 {len(files) - _FILE_HINT_LIMIT} 个其他文件"
+        hints.append(f"📁 当前项目文件: {listing}")
     else:
         hints.append("📁 当前项目为空，请先创建所有必要文件")
 
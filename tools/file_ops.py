@@ -5,25 +5,213 @@
 """
 
 import re
+from collections import OrderedDict
 from typing import List, Union
 
 from ..core.context import ToolContext
 from ..core.error_feedback import ErrorType, ToolResult
 from . import agent_tool
 
+# apply_diff 的 SEARCH/REPLACE 块模式，模块加载时编译一次
+_DIFF_RE = re.compile(r"<<<<<<< SEARCH\n(.*?)\n=======\n(.*?)\n>>>>>>> REPLACE", re.DOTALL)
+
+# pyahocorasick 为可选依赖（perf extras）：hunk 较多时一次线性扫描
+# 定位全部 SEARCH 串，代替每个 hunk 各扫一遍文件；缺失时退回逐个 find
+try:
+    import ahocorasick
+
+    _AHOCORASICK_AVAILABLE = True
+except ImportError:
+    _AHOCORASICK_AVAILABLE = False
+
+# 少于该数量的 hunk 不值得构建自动机
+_AC_MIN_HUNKS = 3
+
+# rapidfuzz 为可选依赖（perf extras）：三个廉价空白修复策略都失败时，
+# 用 C 实现的编辑距离在全文窗口中找最佳匹配；缺失时容错能力不变
+try:
+    from rapidfuzz import fuzz, process as fuzz_process
+
+    _RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    _RAPIDFUZZ_AVAILABLE = False
+
+# 模糊匹配的接受阈值（百分制；低于此分数宁可报错让 Agent 重试）
+_FUZZY_SCORE_CUTOFF = 90
+
+# 行末空白（除换行外的任意空白，等价于逐行 rstrip），
+# C 正则一遍扫完整个文件，省掉 split/rstrip/join 的逐行循环
+_TRAILING_WS_RE = re.compile(r"[^\S\n]+(?=\n|$)")
+
+
+# cli.stream 的一次性解析结果：(task_stream, EventType)。
+# None 表示尚未尝试，(None, None) 表示该模块不可用（插件模式）。
+# 每次写文件都会发事件，不必每次都走 import 机制
+_stream_refs: tuple | None = None
+
 
 async def _emit_file_change(path: str, is_new: bool = False) -> None:
     """尝试发送文件变更事件"""
-    try:
-        from ..cli.stream import EventType, task_stream
+    global _stream_refs
+    if _stream_refs is None:
+        try:
+            from ..cli.stream import EventType, task_stream
+
+            _stream_refs = (task_stream, EventType)
+        except (ImportError, ModuleNotFoundError):
+            _stream_refs = (None, None)
+
+    task_stream, event_type_cls = _stream_refs
+    if task_stream is None:
+        return
+    event_type = event_type_cls.FILE_CREATED if is_new else event_type_cls.FILE_MODIFIED
+    await task_stream.emit_file_event(event_type, path)
+
+
+def _unique_replace(content: str, search: str, replace: str) -> tuple[str | None, int]:
+    """唯一匹配时替换，单遍扫描
+
+    对比 count + replace 的两遍扫描：find 到第一处后只需从其后
+    再 find 一次确认唯一性，发现第二处立即短路，不必数完全部。
+
+    Returns:
+        (替换后的内容, 1) - 唯一匹配
+        (None, 0) - 未找到
+        (None, 2) - 多处匹配（2 仅表示"不止一处"）
+    """
+    i = content.find(search)
+    if i < 0:
+        return None, 0
+    if content.find(search, i + len(search)) >= 0:
+        return None, 2
+    return content[:i] + replace + content[i + len(search):], 1
+
 
-        event_type = EventType.FILE_CREATED if is_new else EventType.FILE_MODIFIED
-        await task_stream.emit_file_event(event_type, path)
-    except (ImportError, ModuleNotFoundError):
-        pass
+def _head_lines(content: str, n: int) -> str:
+    """取前 n 行，定位第 n 个换行符后切片，不物化行列表"""
+    i = -1
+    for _ in range(n):
+        i = content.find("\n", i + 1)
+        if i < 0:
+            return content
+    return content[:i]
 
 
-def _tolerant_match(search: str, content: str) -> str | None:
+def _tail_lines(content: str, n: int) -> str:
+    """取后 n 行（与 _head_lines 对称，从尾部 rfind）"""
+    i = len(content)
+    for _ in range(n):
+        i = content.rfind("\n", 0, i)
+        if i < 0:
+            return content
+    return content[i + 1 :]
+
+
+def _locate_hunks(content: str, hunks: List[tuple]) -> List[tuple] | None:
+    """为每个 hunk 在 content 中找到唯一偏移
+
+    hunk 较多且 pyahocorasick 可用时，构建一次自动机线性扫描全文，
+    同时拿到所有 SEARCH 串的出现位置；否则逐个 find（每个 hunk
+    最多两次探测：定位一次 + 确认唯一性一次）。
+
+    Returns:
+        [(start, end, replace), ...]，任一 hunk 未找到或多处匹配时返回 None
+    """
+    if _AHOCORASICK_AVAILABLE and len(hunks) >= _AC_MIN_HUNKS:
+        searches = [search for search, _ in hunks]
+        # 重复的 SEARCH 串天然有歧义，且会在自动机中互相覆盖
+        if len(set(searches)) == len(searches):
+            automaton = ahocorasick.Automaton()
+            for idx, search in enumerate(searches):
+                automaton.add_word(search, idx)
+            automaton.make_automaton()
+
+            hits: dict = {}
+            for end_idx, idx in automaton.iter(content):
+                if idx in hits:
+                    return None  # 多处匹配
+                hits[idx] = end_idx
+            if len(hits) != len(hunks):
+                return None  # 有 hunk 未找到
+
+            return [
+                (hits[idx] - len(search) + 1, hits[idx] + 1, hunks[idx][1])
+                for idx, search in enumerate(searches)
+            ]
+
+    spans: List[tuple] = []
+    for search, replace in hunks:
+        i = content.find(search)
+        if i < 0 or content.find(search, i + len(search)) >= 0:
+            return None
+        spans.append((i, i + len(search), replace))
+    return spans
+
+
+def _apply_hunks_fast(content: str, hunks: List[tuple]) -> str | None:
+    """多 hunk 的快路径：一次 join 拼出结果
+
+    逐个 replace 会让每个 hunk 都对整个新字符串重扫重建（O(N·F)）。
+    当所有 hunk 都能在原始内容中唯一定位且互不重叠时，按偏移排序后
+    单遍拼接即可（O(F)）。任何 hunk 定位失败/有歧义/重叠时返回 None，
+    由调用方走带容错和错误反馈的逐个替换慢路径。
+    """
+    spans = _locate_hunks(content, hunks)
+    if spans is None:
+        return None
+
+    spans.sort(key=lambda s: s[0])
+    if any(spans[k][1] > spans[k + 1][0] for k in range(len(spans) - 1)):
+        return None
+
+    parts: List[str] = []
+    prev = 0
+    for start, end, replace in spans:
+        parts.append(content[prev:start])
+        parts.append(replace)
+        prev = end
+    parts.append(content[prev:])
+    return "".join(parts)
+
+
+# _tolerant_match 的结果缓存：Agent 重试失败的 DIFF 时 content 往往
+# 未变，相同 (search, content) 直接复用。键只持有字符串引用，不拷贝
+_TOLERANT_CACHE: "OrderedDict[tuple, str | None]" = OrderedDict()
+_TOLERANT_CACHE_MAX = 256
+
+
+def _tolerant_match(
+    search: str,
+    content: str,
+    *,
+    content_stripped: str | None = None,
+    original_lines: List[str] | None = None,
+) -> str | None:
+    """低风险容错匹配（带 LRU 缓存，见 _tolerant_match_impl）"""
+    key = (search, content)
+    if key in _TOLERANT_CACHE:
+        _TOLERANT_CACHE.move_to_end(key)
+        return _TOLERANT_CACHE[key]
+
+    result = _tolerant_match_impl(
+        search,
+        content,
+        content_stripped=content_stripped,
+        original_lines=original_lines,
+    )
+    _TOLERANT_CACHE[key] = result
+    if len(_TOLERANT_CACHE) > _TOLERANT_CACHE_MAX:
+        _TOLERANT_CACHE.popitem(last=False)
+    return result
+
+
+def _tolerant_match_impl(
+    search: str,
+    content: str,
+    *,
+    content_stripped: str | None = None,
+    original_lines: List[str] | None = None,
+) -> str | None:
     """低风险容错匹配
 
     尝试修复常见的空白差异问题:
@@ -31,23 +219,37 @@ def _tolerant_match(search: str, content: str) -> str | None:
     2. 每行末尾多余空格
     3. 连续空行差异
 
+    Args:
+        search: SEARCH 块内容
+        content: 文件当前内容
+        content_stripped: content 去行末空格后的形式（可选，调用方可
+            跨多个 hunk 复用，避免每次都整文件 split/join）
+        original_lines: content 按行切分的结果（同上）
+
     Returns:
         找到匹配时返回 content 中实际匹配的原始字符串，否则返回 None
     """
-    # 策略 1: 去除 search 首尾空白后匹配
-    stripped = search.strip()
-    if stripped and stripped in content:
-        return stripped
-
-    # 策略 2: 去除每行末尾空格后匹配
-    search_lines = search.split("\n")
-    stripped_lines = [line.rstrip() for line in search_lines]
-    stripped_search = "\n".join(stripped_lines)
-    if stripped_search in content:
-        return stripped_search
+    # search 本身没有可修复的空白时，策略 1/2/3 的规范化结果都
+    # 等于 search 自身（调用方已确认精确匹配失败），直接跳过，
+    # 只保留 content 侧规范化与模糊匹配两条路径
+    search_clean = search == search.strip() and _TRAILING_WS_RE.search(search) is None
+
+    if search_clean:
+        stripped_search = search
+    else:
+        # 策略 1: 去除 search 首尾空白后匹配
+        stripped = search.strip()
+        if stripped and stripped in content:
+            return stripped
+
+        # 策略 2: 去除每行末尾空格后匹配
+        stripped_search = _TRAILING_WS_RE.sub("", search)
+        if stripped_search in content:
+            return stripped_search
 
     # 也尝试对 content 进行同样处理（双向容错）
-    content_stripped = "\n".join(line.rstrip() for line in content.split("\n"))
+    if content_stripped is None:
+        content_stripped = _TRAILING_WS_RE.sub("", content)
     if stripped_search in content_stripped:
         # 找到匹配位置，需要返回原始 content 中的对应片段
         start_idx = content_stripped.find(stripped_search)
@@ -56,7 +258,8 @@ def _tolerant_match(search: str, content: str) -> str | None:
             # 通过行号映射回原始内容
             lines_before = content_stripped[:start_idx].count("\n")
             lines_in_match = stripped_search.count("\n")
-            original_lines = content.split("\n")
+            if original_lines is None:
+                original_lines = content.split("\n")
             matched_original = "\n".join(
                 original_lines[lines_before : lines_before + lines_in_match + 1],
             )
@@ -64,9 +267,31 @@ def _tolerant_match(search: str, content: str) -> str | None:
                 return matched_original
 
     # 策略 3: 去除首尾空白 + 行末空格组合
-    combined = "\n".join(line.rstrip() for line in search.strip().split("\n"))
-    if combined in content:
-        return combined
+    if not search_clean:
+        combined = _TRAILING_WS_RE.sub("", search.strip())
+        if combined in content:
+            return combined
+
+    # 策略 4: rapidfuzz 模糊匹配（可选）——按 search 的行数切窗口，
+    # 取编辑距离得分最高且过阈值的窗口。窗口由原始行拼接而成，
+    # 返回值仍是 content 中逐字存在的片段，调用方可直接 replace
+    if _RAPIDFUZZ_AVAILABLE:
+        if original_lines is None:
+            original_lines = content.split("\n")
+        line_count = search.count("\n") + 1
+        if line_count <= len(original_lines):
+            windows = [
+                "\n".join(original_lines[k : k + line_count])
+                for k in range(len(original_lines) - line_count + 1)
+            ]
+            best = fuzz_process.extractOne(
+                search,
+                windows,
+                scorer=fuzz.ratio,
+                score_cutoff=_FUZZY_SCORE_CUTOFF,
+            )
+            if best is not None and best[0]:
+                return best[0]
 
     return None
 
@@ -94,8 +319,7 @@ async def write_file(ctx: ToolContext, path: str, content: str) -> ToolResult:
     ctx.project.write_file(path, content)
 
     # 文件覆写成功，重置该文件的 DIFF 失败计数
-    if path in ctx.state.diff_fail_counts:
-        del ctx.state.diff_fail_counts[path]
+    ctx.state.diff_fail_counts.pop(path, None)
 
     # 检测是否为新文件 (简化逻辑: 假设 write_file 总是可能创建新文件, 或视为 modified)
     # 这里我们统一视为 modified，除非我们检查文件是否存在。
@@ -103,7 +327,8 @@ async def write_file(ctx: ToolContext, path: str, content: str) -> ToolResult:
     await _emit_file_change(path)
 
     size = len(content)
-    lines = content.count("\n") + 1
+    # 空内容算 0 行，而非 count 规则下的 1 行
+    lines = (content.count("\n") + 1) if content else 0
     return ToolResult.ok(f"✅ 已写入 {path} ({lines} 行, {size} 字符)")
 
 
@@ -127,14 +352,13 @@ async def read_file(ctx: ToolContext, path: str) -> ToolResult:
     if content is None:
         return ToolResult.ok(f"❌ 文件不存在: {path}", should_feedback=True)
 
-    lines = content.count("\n") + 1
-    # 如果文件过长，截断显示
+    lines = (content.count("\n") + 1) if content else 0
+    # 如果文件过长，截断显示（首尾各取 50 行，不整文件 split）
     if lines > 100:
-        content_lines = content.split("\n")
         truncated = (
-            "\n".join(content_lines[:50])
+            _head_lines(content, 50)
             + f"\n\n... 中间省略 {lines - 100} 行 ...\n\n"
-            + "\n".join(content_lines[-50:])
+            + _tail_lines(content, 50)
         )
         return ToolResult.ok(
             f"📄 {path} ({lines} 行，已截断)\n\n{truncated}",
@@ -186,8 +410,7 @@ async def apply_diff(ctx: ToolContext, path: str, diff: str) -> ToolResult:
         )
 
     # 解析 SEARCH/REPLACE 块
-    pattern = r"<<<<<<< SEARCH\n(.*?)\n=======\n(.*?)\n>>>>>>> REPLACE"
-    matches = re.findall(pattern, diff, re.DOTALL)
+    matches = _DIFF_RE.findall(diff)
 
     if not matches:
         return ToolResult.error(
@@ -200,27 +423,47 @@ async def apply_diff(ctx: ToolContext, path: str, diff: str) -> ToolResult:
     errors: List[str] = []
     tolerant_applied = 0  # 通过容错匹配成功的数量
 
+    # 快路径：全部 hunk 唯一定位时单遍拼接
+    fast_content = _apply_hunks_fast(content, matches)
+    if fast_content is not None:
+        content = fast_content
+        applied = len(matches)
+        matches = []
+
+    # 容错匹配用的规范化形式，跨 hunk 复用；content 变化后失效
+    norm_for: str | None = None
+    content_stripped: str | None = None
+    original_lines: List[str] | None = None
+
     for search, replace in matches:
-        # 1. 精确匹配
-        match_count = content.count(search)
+        # 1. 精确匹配（单遍扫描，唯一时直接替换）
+        new_content, occurrences = _unique_replace(content, search, replace)
 
-        if match_count == 1:
-            # 唯一匹配，直接替换
-            content = content.replace(search, replace, 1)
+        if occurrences == 1:
+            content = new_content  # type: ignore[assignment]
             applied += 1
             continue
 
-        if match_count > 1:
+        if occurrences > 1:
             # 多处匹配，拒绝执行
             preview = search[:80] + "..." if len(search) > 80 else search
             errors.append(
-                f"❌ 发现 {match_count} 处相同内容，无法确定替换哪一个。请扩展 SEARCH 块的上下文使其唯一:\n"
+                f"❌ 发现多处相同内容，无法确定替换哪一个。请扩展 SEARCH 块的上下文使其唯一:\n"
                 f"```\n{preview}\n```",
             )
             continue
 
         # 2. 精确匹配失败，尝试低风险容错
-        tolerant_search = _tolerant_match(search, content)
+        if norm_for is not content:
+            original_lines = content.split("\n")
+            content_stripped = _TRAILING_WS_RE.sub("", content)
+            norm_for = content
+        tolerant_search = _tolerant_match(
+            search,
+            content,
+            content_stripped=content_stripped,
+            original_lines=original_lines,
+        )
         if tolerant_search:
             content = content.replace(tolerant_search, replace, 1)
             applied += 1
@@ -235,9 +478,8 @@ async def apply_diff(ctx: ToolContext, path: str, diff: str) -> ToolResult:
         )
 
     if errors:
-        # 获取/更新失败计数
-        fail_count = ctx.state.diff_fail_counts.get(path, 0) + 1
-        ctx.state.diff_fail_counts[path] = fail_count
+        # 获取/更新失败计数（单行完成取值与回写）
+        fail_count = ctx.state.diff_fail_counts[path] = ctx.state.diff_fail_counts.get(path, 0) + 1
 
         # 根据失败次数构建不同的反馈
         error_msg = (
@@ -266,9 +508,8 @@ async def apply_diff(ctx: ToolContext, path: str, diff: str) -> ToolResult:
 
         return ToolResult.ok(error_msg, should_feedback=True)
 
-    # 成功：重置失败计数
-    if path in ctx.state.diff_fail_counts:
-        del ctx.state.diff_fail_counts[path]
+    # 成功：重置失败计数（pop 一次哈希完成探测与删除）
+    ctx.state.diff_fail_counts.pop(path, None)
 
     ctx.project.write_file(path, content)
     await _emit_file_change(path)
@@ -296,7 +537,7 @@ async def apply_diff(ctx: ToolContext, path: str, diff: str) -> ToolResult:
 )
 async def delete_file(ctx: ToolContext, path: str) -> ToolResult:
     """删除文件（动作型工具，静默成功）"""
-    if ctx.project.read_file(path) is None:
+    if not ctx.project.exists(path):
         return ToolResult.ok(f"❌ 文件不存在: {path}")
 
     ctx.project.delete_file(path)